@@ -0,0 +1,270 @@
+"""테마 순위표 알림 데몬 (브라우저 없이 실행).
+
+주기마다 전종목 스냅샷 1회 + 뉴스 신호 1회만 수집해 전 테마 순위를 score_all_themes로 계산하고,
+직전 주기 결과와 비교해 규칙(새 1위, 점수 급등, 특징주 뉴스 급증)을 평가한다.
+알림은 중복 제거 후 싱크(stdout / 파일 / 웹훅)로 보낸다.
+
+    python alerts.py --once
+    python alerts.py --interval 300 --budget 60 --sink stdout --sink file:alerts.jsonl
+    python alerts.py --sink webhook:https://example.com/hook --score-jump 15 --news-spike 5
+"""
+
+import abc
+import argparse
+import json
+import sys
+import time
+import datetime as dt
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+import pandas as pd
+import requests
+from streamlit.logger import set_log_level
+
+from theme_leader import (
+    DEFAULT_MIN_MARCAP,
+    collect_news_signals,
+    listing_index,
+    market_snapshot,
+    score_all_themes,
+    theme_membership,
+)
+
+
+@dataclass
+class Alert:
+    rule: str
+    theme: str
+    name: str
+    code: str
+    message: str
+    key: str  # 중복 제거 키
+    at: str = ""
+
+
+class Rule(abc.ABC):
+    name = ""
+
+    @abc.abstractmethod
+    def evaluate(self, prev: Optional[pd.DataFrame], cur: pd.DataFrame) -> List[Alert]:
+        """직전 주기(prev, 첫 주기는 None)와 현재 순위표를 비교해 알림 목록을 반환."""
+
+
+class NewLeaderRule(Rule):
+    """테마 1위가 바뀌면 알림."""
+
+    name = "new_leader"
+
+    def evaluate(self, prev, cur):
+        if prev is None:
+            return []
+        old = prev[prev["rank"] == 1].set_index("theme")["Code"]
+        out = []
+        for r in cur[cur["rank"] == 1].itertuples():
+            if old.get(r.theme) not in (None, r.Code):
+                out.append(
+                    Alert(self.name, r.theme, r.Name, r.Code, f"[{r.theme}] 새 1위: {r.Name} (주도점수 {r.leader_score:.1f})", f"{self.name}:{r.theme}:{r.Code}")
+                )
+        return out
+
+
+class ScoreJumpRule(Rule):
+    """직전 주기 대비 주도점수가 threshold 이상 오르면 알림."""
+
+    name = "score_jump"
+
+    def __init__(self, threshold: float = 15.0):
+        self.threshold = threshold
+
+    def evaluate(self, prev, cur):
+        if prev is None:
+            return []
+        m = cur.merge(prev[["theme", "Code", "leader_score"]], on=["theme", "Code"], suffixes=("", "_prev"))
+        m = m[m["leader_score"] - m["leader_score_prev"] >= self.threshold]
+        return [
+            Alert(
+                self.name,
+                r.theme,
+                r.Name,
+                r.Code,
+                f"[{r.theme}] {r.Name} 주도점수 급등 {r.leader_score_prev:.1f} → {r.leader_score:.1f}",
+                f"{self.name}:{r.theme}:{r.Code}",
+            )
+            for r in m.itertuples()
+        ]
+
+
+class NewsSpikeRule(Rule):
+    """특징주 뉴스건수가 min_hits 이상이고 직전 대비 ratio 배 이상이면 알림."""
+
+    name = "news_spike"
+
+    def __init__(self, min_hits: int = 5, ratio: float = 2.0):
+        self.min_hits = min_hits
+        self.ratio = ratio
+
+    def evaluate(self, prev, cur):
+        base = cur.drop_duplicates("Code").set_index("Code")["news_hits"]
+        if prev is not None:
+            before = prev.drop_duplicates("Code").set_index("Code")["news_hits"].reindex(base.index).fillna(0)
+        else:
+            before = pd.Series(0, index=base.index)
+        spiked = base[(base >= self.min_hits) & (base >= before.clip(lower=1) * self.ratio)]
+        rows = cur[cur["Code"].isin(spiked.index)].drop_duplicates("Code")
+        return [
+            Alert(self.name, r.theme, r.Name, r.Code, f"[{r.theme}] {r.Name} 특징주 뉴스 {int(r.news_hits)}건", f"{self.name}:{r.Code}")
+            for r in rows.itertuples()
+        ]
+
+
+class StdoutSink:
+    def send(self, alert: Alert) -> None:
+        print(f"{alert.at} {alert.message}", flush=True)
+
+
+class FileSink:
+    """JSON Lines 로 누적 기록."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def send(self, alert: Alert) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(asdict(alert), ensure_ascii=False) + "\n")
+
+
+class WebhookSink:
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def send(self, alert: Alert) -> None:
+        r = self.session.post(self.url, json={**asdict(alert), "text": alert.message}, timeout=self.timeout)
+        r.raise_for_status()
+
+
+def make_sink(spec: str):
+    """'stdout' | 'file:<경로>' | 'webhook:<URL>'"""
+    kind, _, arg = spec.partition(":")
+    if kind == "stdout":
+        return StdoutSink()
+    if kind == "file" and arg:
+        return FileSink(arg)
+    if kind == "webhook" and arg:
+        return WebhookSink(arg)
+    raise ValueError(f"알 수 없는 싱크: {spec}")
+
+
+class Deduper:
+    """같은 키의 알림은 ttl 초 동안 한 번만 통과. 기록(record)은 전송에 성공한 뒤에만 한다."""
+
+    def __init__(self, ttl: float = 60 * 60 * 6):
+        self.ttl = ttl
+        self.sent: Dict[str, float] = {}
+
+    def allow(self, key: str, now: float) -> bool:
+        # ttl 이 지난 키는 더 막을 일이 없으므로 정리해 sent 가 무한히 커지지 않게 한다
+        self.sent = {k: t for k, t in self.sent.items() if now - t < self.ttl}
+        last = self.sent.get(key)
+        return last is None or now - last >= self.ttl
+
+    def record(self, key: str, now: float) -> None:
+        self.sent[key] = now
+
+
+class AlertDaemon:
+    def __init__(
+        self,
+        rules: List[Rule],
+        sinks: list,
+        interval: float = 300,
+        budget: float = 60,
+        min_marcap=DEFAULT_MIN_MARCAP,
+        include_classified: bool = False,
+        dedup_ttl: float = 60 * 60 * 6,
+    ):
+        self.rules = rules
+        self.sinks = sinks
+        self.interval = interval
+        self.budget = budget
+        self.min_marcap = min_marcap
+        self.include_classified = include_classified
+        self.dedup = Deduper(dedup_ttl)
+        self.prev: Optional[pd.DataFrame] = None
+
+    def evaluate(self) -> pd.DataFrame:
+        """전 테마 순위 1회 계산. 스냅샷/뉴스는 모든 테마·규칙이 공유한다."""
+        started = time.monotonic()
+        membership = theme_membership(listing_index(), self.include_classified)
+        snap = market_snapshot(membership["Code"].unique().tolist())
+        names = membership.loc[membership["Code"].map(snap["marcap"]) >= self.min_marcap, "Name"].unique().tolist()
+        # 남은 예산 안에서만 뉴스 수집, 늦은 종목은 저장된 헤드라인으로 계산
+        remaining = max(1.0, self.budget - (time.monotonic() - started))
+        signals = collect_news_signals(names, budget=remaining)
+        return score_all_themes(snap, membership, signals, self.min_marcap)
+
+    def cycle(self) -> List[Alert]:
+        cur = self.evaluate()
+        now = time.time()
+        stamp = dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        sent = []
+        for rule in self.rules:
+            for alert in rule.evaluate(self.prev, cur):
+                if not self.dedup.allow(alert.key, now):
+                    continue
+                alert.at = stamp
+                delivered = False
+                for sink in self.sinks:
+                    try:
+                        sink.send(alert)
+                        delivered = True
+                    except Exception as e:
+                        print(f"알림 전송 실패({type(sink).__name__}): {e}", file=sys.stderr)
+                # 모든 싱크가 실패하면 기록하지 않아 다음 주기에 다시 보낸다
+                if delivered:
+                    self.dedup.record(alert.key, now)
+                    sent.append(alert)
+        if not cur.empty:
+            self.prev = cur
+        return sent
+
+    def run(self, once: bool = False) -> None:
+        while True:
+            started = time.monotonic()
+            try:
+                self.cycle()
+            except Exception as e:
+                print(f"평가 실패: {e}", file=sys.stderr)
+            if once:
+                return
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+def main(argv=None) -> None:
+    p = argparse.ArgumentParser(description="테마 순위표 알림 데몬")
+    p.add_argument("--interval", type=float, default=300, help="평가 주기(초)")
+    p.add_argument("--budget", type=float, default=60, help="주기당 데이터 수집 시간 예산(초)")
+    p.add_argument("--sink", action="append", default=[], help="stdout | file:<경로> | webhook:<URL> (여러 번 지정 가능)")
+    p.add_argument("--score-jump", type=float, default=15.0, help="주도점수 급등 기준(점)")
+    p.add_argument("--news-spike", type=int, default=5, help="특징주 뉴스 급증 최소 건수")
+    p.add_argument("--min-marcap", type=float, default=DEFAULT_MIN_MARCAP)
+    p.add_argument("--include-classified", action="store_true", help="배치 분류 결과의 종목까지 테마 구성에 포함")
+    p.add_argument("--once", action="store_true", help="1회만 평가하고 종료")
+    args = p.parse_args(argv)
+
+    set_log_level("error")
+    daemon = AlertDaemon(
+        rules=[NewLeaderRule(), ScoreJumpRule(args.score_jump), NewsSpikeRule(args.news_spike)],
+        sinks=[make_sink(s) for s in (args.sink or ["stdout"])],
+        interval=args.interval,
+        budget=args.budget,
+        min_marcap=args.min_marcap,
+        include_classified=args.include_classified,
+    )
+    daemon.run(once=args.once)
+
+
+if __name__ == "__main__":
+    main()
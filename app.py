@@ -1,16 +1,42 @@
-import re
-import datetime as dt
-from typing import Dict, List
+import time
+from typing import Tuple
+
+# 시작 계측: 이 지점부터 import/첫 화면까지 (설정 > 진단에 표시)
+_script_started = time.perf_counter()
 
 import numpy as np
 import pandas as pd
-import requests
 import streamlit as st
-from bs4 import BeautifulSoup
-import plotly.graph_objects as go
 
-import FinanceDataReader as fdr
-from pykrx import stock
+from lazy_import import LazyModule
+from theme_leader import (
+    CHART_MAX_BARS,
+    CHART_MAX_BARS_MOBILE,
+    CHART_RANGES,
+    DEFAULT_MIN_MARCAP,
+    STREAM_UI_REFRESH_SEC,
+    ListingIndex,
+    cache_warmer,
+    chart_bars,
+    cross_theme_board,
+    fetch_news_links,
+    infer_themes,
+    leaderboard,
+    leaderboard_engine,
+    listing_index,
+    metrics_server,
+    runtime_counters,
+    snapshot_poller,
+    startup_report,
+    stock_frames,
+    theme_dictionary,
+    theme_store,
+)
+from metrics import METRICS
+
+_imported = time.perf_counter()
+# 차트를 그릴 때만 import
+go = LazyModule("plotly.graph_objects")
 
 st.set_page_config(page_title="ShadowTrade Pro", page_icon="📈", layout="wide")
 
@@ -158,293 +184,70 @@ div[data-testid="stDataFrame"] {
 )
 
 
-# --------------------------
-# Theme universe (editable)
-# --------------------------
-THEME_MAP: Dict[str, List[str]] = {
-    "반도체": ["삼성전자", "SK하이닉스", "한미반도체", "리노공업", "DB하이텍", "원익IPS", "ISC"],
-    "2차전지": ["에코프로", "에코프로비엠", "엘앤에프", "포스코퓨처엠", "LG에너지솔루션", "삼성SDI"],
-    "로봇": ["레인보우로보틱스", "두산로보틱스", "로보스타", "유일로보틱스", "에스피지"],
-    "방산": ["한화에어로스페이스", "LIG넥스원", "현대로템", "한국항공우주", "풍산"],
-    "전력": ["LS ELECTRIC", "효성중공업", "HD현대일렉트릭", "일진전기", "가온전선"],
-    "원전": ["두산에너빌리티", "한전기술", "한전KPS", "우리기술", "비에이치아이"],
-    "조선": ["HD한국조선해양", "HD현대중공업", "한화오션", "삼성중공업", "HSD엔진"],
-    "AI": ["NAVER", "카카오", "삼성전자", "SK하이닉스", "폴라리스오피스", "이스트소프트"],
-    "양자": ["우리로", "엑스게이트", "드림시큐리티", "텔레필드", "케이씨에스"],
-    "바이오": ["삼성바이오로직스", "셀트리온", "HLB", "알테오젠", "유한양행"],
-}
-
-THEME_KEYWORDS: Dict[str, List[str]] = {
-    "반도체": ["반도체", "HBM", "메모리", "파운드리"],
-    "2차전지": ["2차전지", "배터리", "양극재", "음극재", "전해질"],
-    "로봇": ["로봇", "자동화", "협동로봇"],
-    "방산": ["방산", "미사일", "국방", "K-방산"],
-    "전력": ["전력", "변압기", "전선", "전력기기"],
-    "원전": ["원전", "SMR", "원자력"],
-    "조선": ["조선", "LNG선", "선박"],
-    "AI": ["AI", "인공지능", "LLM", "데이터센터"],
-    "양자": ["양자", "퀀텀", "양자컴퓨팅"],
-    "바이오": ["바이오", "신약", "임상", "항체"],
-}
+def _segments(x: pd.Index, y0: pd.Series, y1: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    # 봉마다 (x, y0) → (x, y1) 선분, 사이를 None/NaN 으로 끊어 한 트레이스에 담는다
+    xs = np.empty(len(x) * 3, dtype=object)
+    ys = np.full(len(x) * 3, np.nan)
+    xs[0::3] = xs[1::3] = x.to_pydatetime()
+    ys[0::3], ys[1::3] = y0.to_numpy(float), y1.to_numpy(float)
+    return xs, ys
 
 
-@st.cache_data(ttl=60 * 30)
-def get_krx_listing() -> pd.DataFrame:
-    df = fdr.StockListing("KRX")
-    keep = [c for c in ["Code", "Name", "Market", "Sector", "Industry", "Marcap"] if c in df.columns]
-    df = df[keep].copy()
-    df["Code"] = df["Code"].astype(str).str.zfill(6)
-    return df
-
-
-def latest_bday_str() -> str:
-    d = dt.date.today()
-    for i in range(7):
-        day = d - dt.timedelta(days=i)
-        s = day.strftime("%Y%m%d")
-        try:
-            if stock.get_market_ticker_list(s):
-                return s
-        except Exception:
-            pass
-    return d.strftime("%Y%m%d")
-
-
-@st.cache_data(ttl=60 * 10)
-def get_latest_ohlcv(date_str: str) -> pd.DataFrame:
-    """pykrx 우선, 실패 시 빈 DF 반환(상위에서 FDR 폴백 처리)."""
-    try:
-        o = stock.get_market_ohlcv_by_ticker(date_str, market="ALL").reset_index()
-        o = o.rename(columns={"티커": "Code", "종가": "close", "등락률": "chg_pct", "거래대금": "value"})
-        o["Code"] = o["Code"].astype(str).str.zfill(6)
-        return o[["Code", "close", "chg_pct", "value"]]
-    except Exception:
-        return pd.DataFrame(columns=["Code", "close", "chg_pct", "value"])
-
-
-@st.cache_data(ttl=60 * 10)
-def get_latest_marcap(date_str: str) -> pd.DataFrame:
-    try:
-        m = stock.get_market_cap_by_ticker(date_str, market="ALL").reset_index()
-        m = m.rename(columns={"티커": "Code", "시가총액": "marcap"})
-        m["Code"] = m["Code"].astype(str).str.zfill(6)
-        return m[["Code", "marcap"]]
-    except Exception:
-        return pd.DataFrame(columns=["Code", "marcap"])
-
-
-def fallback_price_snapshot(codes: List[str]) -> pd.DataFrame:
-    """FDR 기반 폴백: 최근 10일에서 마지막 2개 거래일로 등락률/거래대금 근사치 생성."""
-    rows = []
-    end = dt.date.today()
-    start = end - dt.timedelta(days=14)
-    for code in codes:
-        try:
-            h = fdr.DataReader(code, start, end)
-            if h is None or len(h) < 2:
-                continue
-            h = h.dropna()
-            if len(h) < 2:
-                continue
-            last = h.iloc[-1]
-            prev = h.iloc[-2]
-            close = float(last["Close"])
-            prev_close = float(prev["Close"])
-            chg_pct = ((close / prev_close) - 1.0) * 100 if prev_close else 0.0
-            value = float(last.get("Volume", 0)) * close
-            rows.append({"Code": str(code).zfill(6), "close": close, "chg_pct": chg_pct, "value": value})
-        except Exception:
-            continue
-    return pd.DataFrame(rows, columns=["Code", "close", "chg_pct", "value"])
-
-
-@st.cache_data(ttl=60 * 8)
-def fetch_news_titles(query: str, limit: int = 20) -> List[str]:
-    url = f"https://search.naver.com/search.naver?where=news&query={query}"
-    r = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
-    r.raise_for_status()
-    soup = BeautifulSoup(r.text, "lxml")
-    out = []
-    for a in soup.select("a.news_tit")[:limit]:
-        t = a.get("title") or a.get_text(" ", strip=True)
-        if t:
-            out.append(t)
-    return out
-
-
-@st.cache_data(ttl=60 * 10)
-def fetch_news_links(query: str, limit: int = 10) -> List[tuple]:
-    url = f"https://search.naver.com/search.naver?where=news&query={query}"
-    r = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10)
-    r.raise_for_status()
-    soup = BeautifulSoup(r.text, "lxml")
-    out = []
-    for a in soup.select("a.news_tit")[:limit]:
-        title = a.get("title") or a.get_text(" ", strip=True)
-        link = a.get("href")
-        if title and link:
-            out.append((title, link))
-    return out
-
-
-def minmax(s: pd.Series) -> pd.Series:
-    if len(s) == 0 or s.max() == s.min():
-        return pd.Series(np.zeros(len(s)), index=s.index)
-    return (s - s.min()) / (s.max() - s.min())
-
-
-def infer_themes(name: str, listing_df: pd.DataFrame) -> List[str]:
-    # 1) 직접 사전 매칭
-    direct = [t for t, arr in THEME_MAP.items() if name in arr]
-    if direct:
-        return direct
-
-    scored: Dict[str, int] = {}
-
-    # 2) 뉴스 키워드 매칭(테마명 + 동의어)
-    try:
-        blob = " ".join(fetch_news_titles(name, 30))
-        for theme, kws in THEME_KEYWORDS.items():
-            cnt = 0
-            for kw in [theme] + kws:
-                cnt += len(re.findall(re.escape(kw), blob, flags=re.IGNORECASE))
-            if cnt > 0:
-                scored[theme] = scored.get(theme, 0) + cnt
-    except Exception:
-        pass
-
-    # 3) 업종/섹터 힌트 매칭
-    row = listing_df[listing_df["Name"] == name]
-    if not row.empty:
-        txt = " ".join(
-            [
-                str(row.iloc[0].get("Sector", "")),
-                str(row.iloc[0].get("Industry", "")),
-            ]
-        )
-        for theme, kws in THEME_KEYWORDS.items():
-            cnt = 0
-            for kw in [theme] + kws:
-                cnt += len(re.findall(re.escape(kw), txt, flags=re.IGNORECASE))
-            if cnt > 0:
-                scored[theme] = scored.get(theme, 0) + cnt
-
-    ranked = [k for k, _ in sorted(scored.items(), key=lambda x: x[1], reverse=True)]
-    return ranked[:4]
-
-
-def build_top(theme: str, min_marcap=500_000_000_000, top_n=10) -> pd.DataFrame:
-    listing = get_krx_listing()
-    if theme not in THEME_MAP:
-        return pd.DataFrame()
-
-    universe = pd.DataFrame({"Name": THEME_MAP[theme]})
-    universe = universe.merge(listing[["Name", "Code", "Market"]], on="Name", how="left").dropna(subset=["Code"])
-
-    ds = latest_bday_str()
-    px = get_latest_ohlcv(ds)
-    if px.empty:
-        px = fallback_price_snapshot(universe["Code"].tolist())
-
-    mc = get_latest_marcap(ds)
-    # pykrx 실패 시 listing의 Marcap 사용
-    if mc.empty and "Marcap" in listing.columns:
-        mc = listing[["Code", "Marcap"]].rename(columns={"Marcap": "marcap"}).copy()
-
-    df = universe.merge(px, on="Code", how="left").merge(mc, on="Code", how="left")
-    # 가격정보가 없는 행 제거
-    df = df.dropna(subset=["close", "chg_pct", "value"], how="any")
-    # 시총 결측이면 0 처리 후 필터
-    df["marcap"] = pd.to_numeric(df["marcap"], errors="coerce").fillna(0)
-    df = df[df["marcap"] >= min_marcap].copy()
-    if df.empty:
-        return df
-
-    # proxies for "실시간 조회순위" and 뉴스 모멘텀
-    pop = {}
-    hit = {}
-    for n in df["Name"].tolist():
-        try:
-            t = fetch_news_titles(n, 20)
-            pop[n] = float(len(t))
-            hit[n] = len(fetch_news_titles(f"{n} 특징주", 20))
-        except Exception:
-            pop[n], hit[n] = 0.0, 0
-
-    df["popularity"] = df["Name"].map(pop)
-    df["news_hits"] = df["Name"].map(hit)
-
-    # leader model from your rules
-    # 거래대금 + 등락률 + 조회(관심) + 뉴스(재료)
-    df["s_value"] = minmax(df["value"]) * 35
-    df["s_chg"] = minmax(df["chg_pct"]) * 30
-    df["s_pop"] = minmax(df["popularity"]) * 15
-    df["s_news"] = minmax(df["news_hits"]) * 20
-    df["leader_score"] = (df["s_value"] + df["s_chg"] + df["s_pop"] + df["s_news"]).round(2)
-
-    return df.sort_values("leader_score", ascending=False).head(top_n)
-
-
-@st.cache_data(ttl=60 * 10)
-def fetch_hist(code: str, days: int = 240) -> pd.DataFrame:
-    end = dt.date.today()
-    start = end - dt.timedelta(days=days)
-    return fdr.DataReader(code, start, end)
-
-
-def render_candle(code: str, name: str):
-    df = fetch_hist(code)
+def render_candle(code: str, name: str, df: pd.DataFrame, resolution: str = "일봉", height: int = 450):
+    """캔들을 WebGL(Scattergl) 선분으로 그린다. 꼬리/몸통을 상승·하락별 트레이스 1개씩으로 묶는다."""
     if df.empty:
         st.warning("차트 데이터가 없습니다.")
         return
-    fig = go.Figure(
-        go.Candlestick(
+    up = df["Close"] >= df["Open"]
+    body_width = max(1, min(8, 700 // len(df)))
+    fig = go.Figure()
+    for mask, color in ((up, "#43d69f"), (~up, "#ff6b87")):
+        part = df[mask]
+        if part.empty:
+            continue
+        for y0, y1, width in (("Low", "High", 1), ("Open", "Close", body_width)):
+            xs, ys = _segments(part.index, part[y0], part[y1])
+            fig.add_trace(
+                go.Scattergl(x=xs, y=ys, mode="lines", line=dict(color=color, width=width), hoverinfo="skip", showlegend=False)
+            )
+    fig.add_trace(
+        go.Scattergl(
             x=df.index,
-            open=df["Open"],
-            high=df["High"],
-            low=df["Low"],
-            close=df["Close"],
-            increasing_line_color="#43d69f",
-            decreasing_line_color="#ff6b87",
+            y=df["Close"],
+            mode="markers",
+            marker=dict(size=max(4, body_width), opacity=0),
+            customdata=df[["Open", "High", "Low"]].to_numpy(),
+            hovertemplate="%{x|%Y-%m-%d}<br>시 %{customdata[0]:,.0f} 고 %{customdata[1]:,.0f}<br>저 %{customdata[2]:,.0f} 종 %{y:,.0f}<extra></extra>",
             name=name,
+            showlegend=False,
         )
     )
     fig.update_layout(
-        height=450,
+        height=height,
         margin=dict(l=8, r=8, t=36, b=8),
-        xaxis_rangeslider_visible=False,
         template="plotly_dark",
-        title=f"{name} ({code})",
+        hovermode="closest",
+        title=f"{name} ({code}) · {resolution}",
     )
     st.plotly_chart(fig, width="stretch")
 
 
-def render_stock_analysis(code: str, name: str, listing_df: pd.DataFrame):
-    h = fetch_hist(code)
-    if h is None or h.empty or len(h) < 5:
+def render_stock_analysis(code: str, name: str, index: ListingIndex, ind: pd.DataFrame):
+    if ind.empty or len(ind) < 5:
         st.info("분석 데이터가 충분하지 않습니다.")
         return
 
-    close = h["Close"].dropna()
-    vol = h["Volume"].fillna(0)
-
-    latest = float(close.iloc[-1])
-    ret_1m = (latest / float(close.iloc[-21]) - 1) * 100 if len(close) >= 21 else np.nan
-    ret_3m = (latest / float(close.iloc[-63]) - 1) * 100 if len(close) >= 63 else np.nan
-
-    ma20 = close.rolling(20).mean().iloc[-1] if len(close) >= 20 else np.nan
-    ma60 = close.rolling(60).mean().iloc[-1] if len(close) >= 60 else np.nan
-
-    vol20 = vol.rolling(20).mean().iloc[-1] if len(vol) >= 20 else np.nan
-    vol_ratio = float(vol.iloc[-1] / vol20) if vol20 and not np.isnan(vol20) else np.nan
-
-    high_52w = float(close.tail(252).max()) if len(close) >= 2 else latest
-    low_52w = float(close.tail(252).min()) if len(close) >= 2 else latest
+    last = ind.iloc[-1]
+    latest = float(last["close"])
+    ret_1m, ret_3m = last["ret_1m"], last["ret_3m"]
+    ma20, ma60 = last["ma20"], last["ma60"]
+    vol_ratio = last["vol_ratio"]
+    high_52w, low_52w = float(last["high_52w"]), float(last["low_52w"])
 
-    info = listing_df[listing_df["Code"] == code]
-    market = info["Market"].iloc[0] if not info.empty and "Market" in info.columns else "-"
-    sector = info["Sector"].iloc[0] if not info.empty and "Sector" in info.columns else "-"
-    industry = info["Industry"].iloc[0] if not info.empty and "Industry" in info.columns else "-"
+    info = index.row_by_code(code)
+    market = info.get("Market", "-") if info is not None else "-"
+    sector = info.get("Sector", "-") if info is not None else "-"
+    industry = info.get("Industry", "-") if info is not None else "-"
 
     st.markdown("#### 📊 종목 분석")
     c1, c2, c3 = st.columns(3)
@@ -458,6 +261,36 @@ def render_stock_analysis(code: str, name: str, listing_df: pd.DataFrame):
     st.write(f"- 시장: **{market}**, 섹터: **{sector}**, 업종: **{industry}**")
 
 
+def load_top(theme: str, min_marcap=DEFAULT_MIN_MARCAP, top_n=10):
+    # 스트리밍 모드에서 같은 조건으로 다시 조회할 수 있도록 조건도 함께 보관
+    st.session_state.top_params = (theme, int(min_marcap), int(top_n))
+    st.session_state.top_df = leaderboard(theme, min_marcap=min_marcap, top_n=top_n)
+
+
+@st.fragment(run_every=STREAM_UI_REFRESH_SEC)
+def render_top_table():
+    # 이 영역만 주기적으로 재실행하고, 스트리밍 중일 때만 순위를 다시 조회한다.
+    # (설정 탭의 스트리밍 토글은 이 함수 정의 뒤에 적용되므로 run_every 를 폴러 상태로 정하지 않는다)
+    if snapshot_poller().running and st.session_state.top_params:
+        st.session_state.top_df = leaderboard(*st.session_state.top_params)
+    df = st.session_state.top_df
+    if df.empty:
+        st.info("해당 조건의 종목이 없습니다.")
+        return
+    show = df[["Name", "Code", "Market", "chg_pct", "value", "marcap", "popularity", "news_hits", "leader_score"]]
+    show.columns = ["종목", "코드", "시장", "등락률(%)", "거래대금", "시총", "관심도", "뉴스건수", "주도점수"]
+    st.dataframe(show, width="stretch", hide_index=True)
+
+    computed_at = df.attrs.get("computed_at")
+    st.caption(
+        "주도점수 = 거래대금(35) + 등락률(30) + 관심도(15) + 뉴스모멘텀(20)"
+        + (f" · 계산 시각 {computed_at:%H:%M:%S}" if computed_at else "")
+    )
+    fails = df.attrs.get("price_failures")
+    if fails:
+        st.caption("가격 폴백 실패: " + ", ".join(f"{c}({why})" for c, why in fails.items()))
+
+
 # --------------------------
 # Header
 # --------------------------
@@ -486,11 +319,17 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-listing = get_krx_listing()
-all_names = set(listing["Name"].tolist())
+lidx = listing_index()
+theme_dict = theme_dictionary()  # themes.json (수정 시 자동 반영)
+theme_map = theme_dict.theme_map
+cache_warmer()  # 시작 시 + 개장 전/마감 후 캐시 사전 준비
+leaderboard_engine()  # 전 테마 순위표 백그라운드 갱신 시작
+metrics_server()  # THEME_LEADER_METRICS_PORT 지정 시 /metrics 노출
 
 if "top_df" not in st.session_state:
     st.session_state.top_df = pd.DataFrame()
+if "top_params" not in st.session_state:
+    st.session_state.top_params = None
 if "selected_theme" not in st.session_state:
     st.session_state.selected_theme = "반도체"
 if "inferred_themes" not in st.session_state:
@@ -524,8 +363,7 @@ tab1, tab2, tab3, tab4 = st.tabs(["키워드", "TOP10", "사전(테마)", "설
 with tab1:
     st.markdown('<div class="glass">', unsafe_allow_html=True)
     st.subheader("키워드/종목 입력")
-    name_list = sorted(list(all_names))
-    picked_name = st.selectbox("종목명 목록에서 선택", options=name_list, index=name_list.index("삼성전자") if "삼성전자" in name_list else 0)
+    picked_name = st.selectbox("종목명 목록에서 선택", options=lidx.names, index=lidx.name_pos.get("삼성전자", 0))
     typed_name = st.text_input("또는 직접 입력", placeholder="예) 삼성전자")
     stock_name = typed_name.strip() if typed_name.strip() else picked_name
 
@@ -538,29 +376,29 @@ with tab1:
     if run or refresh:
         if not stock_name:
             st.warning("종목명을 입력해 주세요.")
-        elif stock_name not in all_names:
+        elif stock_name not in lidx:
             st.error("KRX 상장 종목명 기준으로 정확히 입력해 주세요.")
         else:
-            themes = infer_themes(stock_name, listing)
+            themes = infer_themes(stock_name, lidx)
             st.session_state.inferred_themes = themes
             if themes:
                 st.session_state.selected_theme = themes[0]
                 st.success(f"연관 테마 추정: {', '.join(themes)}")
-                st.session_state.top_df = build_top(st.session_state.selected_theme, top_n=10)
+                load_top(st.session_state.selected_theme)
             else:
                 st.warning("이 종목의 테마를 자동으로 특정하지 못했습니다. 아래에서 테마를 직접 선택해 주세요.")
 
-    theme_candidates = st.session_state.inferred_themes if st.session_state.inferred_themes else list(THEME_MAP.keys())[:6]
+    theme_candidates = st.session_state.inferred_themes if st.session_state.inferred_themes else theme_dict.themes[:6]
     st.markdown("#### 연관 테마 빠른 선택")
     cols = st.columns(min(4, len(theme_candidates)))
     for i, t in enumerate(theme_candidates):
         with cols[i % len(cols)]:
             if st.button(f"테마: {t}", key=f"theme_btn_{t}", width="stretch"):
                 st.session_state.selected_theme = t
-                st.session_state.top_df = build_top(t, top_n=10)
+                load_top(t)
 
     st.markdown("#### 관련 테마주 버튼")
-    stocks = THEME_MAP.get(st.session_state.selected_theme, [])
+    stocks = theme_map.get(st.session_state.selected_theme, [])
     if stocks:
         cols2 = st.columns(3)
         for i, s in enumerate(stocks[:12]):
@@ -578,32 +416,32 @@ with tab2:
     if st.session_state.top_df.empty:
         st.info("키워드 탭에서 종목명을 입력하고 찾기를 눌러 주세요.")
     else:
+        render_top_table()
         df = st.session_state.top_df.copy()
-        show = df[["Name", "Code", "Market", "chg_pct", "value", "marcap", "popularity", "news_hits", "leader_score"]]
-        show.columns = ["종목", "코드", "시장", "등락률(%)", "거래대금", "시총", "관심도", "뉴스건수", "주도점수"]
-        st.dataframe(show, width="stretch", hide_index=True)
-
-        st.caption("주도점수 = 거래대금(35) + 등락률(30) + 관심도(15) + 뉴스모멘텀(20)")
 
         st.markdown("#### Top10 빠른 선택")
         quick_cols = st.columns(2)
-        for i, nm in enumerate(show["종목"].tolist()):
+        options = df["Name"].tolist()
+        for i, nm in enumerate(options):
             with quick_cols[i % 2]:
                 if st.button(f"{i+1}. {nm}", key=f"top_pick_{nm}", width="stretch"):
                     st.session_state.picked_stock = nm
 
-        options = show["종목"].tolist()
         default_idx = 0
         if st.session_state.picked_stock in options:
             default_idx = options.index(st.session_state.picked_stock)
         picked = st.selectbox("상세 보기 종목", options, index=default_idx)
         r = df[df["Name"] == picked].iloc[0]
 
+        _, ind = stock_frames(r["Code"])
         dtab1, dtab2, dtab3 = st.tabs(["주가 흐름", "종목분석", "관련 뉴스"])
         with dtab1:
-            render_candle(r["Code"], r["Name"])
+            span = st.radio("기간", list(CHART_RANGES), index=1, horizontal=True, key="chart_range")
+            max_bars = CHART_MAX_BARS_MOBILE if st.session_state.ultra_mobile else CHART_MAX_BARS
+            bars, resolution = chart_bars(r["Code"], CHART_RANGES[span], max_bars)
+            render_candle(r["Code"], r["Name"], bars, resolution, 360 if st.session_state.ultra_mobile else 450)
         with dtab2:
-            render_stock_analysis(r["Code"], r["Name"], listing)
+            render_stock_analysis(r["Code"], r["Name"], lidx, ind)
         with dtab3:
             st.markdown("#### 📰 관련 뉴스")
             try:
@@ -620,28 +458,87 @@ with tab2:
 with tab3:
     st.markdown('<div class="glass">', unsafe_allow_html=True)
     st.subheader("테마 사전")
-    theme = st.selectbox("테마 선택", list(THEME_MAP.keys()), index=list(THEME_MAP.keys()).index(st.session_state.selected_theme) if st.session_state.selected_theme in THEME_MAP else 0)
+    theme = st.selectbox("테마 선택", theme_dict.themes, index=theme_dict.themes.index(st.session_state.selected_theme) if st.session_state.selected_theme in theme_map else 0)
     st.session_state.selected_theme = theme
 
-    stocks = THEME_MAP.get(theme, [])
+    stocks = theme_map.get(theme, [])
     st.markdown("  ".join([f"`{s}`" for s in stocks]))
+    st.caption(f"사전 버전 {theme_dict.label or '-'} ({theme_dict.version}) · 테마 {len(theme_map)}개")
+    if theme_store().error:
+        st.warning(f"themes.json 을 읽지 못해 이전 버전을 사용 중입니다: {theme_store().error}")
 
     if st.button("이 테마로 TOP10 재계산", width="stretch"):
-        st.session_state.top_df = build_top(theme, top_n=10)
+        load_top(theme)
         st.success("갱신 완료")
+
+    st.markdown("#### 테마별 1위 주도주")
+    if st.button("전 테마 1위 보기", width="stretch"):
+        st.session_state.show_champions = True
+    if st.session_state.get("show_champions"):
+        champs = cross_theme_board()
+        if champs.empty:
+            st.info("시세 데이터를 불러오지 못했습니다.")
+        else:
+            show = champs[["theme", "Name", "chg_pct", "value", "leader_score"]]
+            show.columns = ["테마", "종목", "등락률(%)", "거래대금", "주도점수"]
+            st.dataframe(show, width="stretch", hide_index=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
 with tab4:
     st.markdown('<div class="glass">', unsafe_allow_html=True)
     st.subheader("설정")
     top_n = st.slider("TOP N", 5, 20, 10)
-    min_cap = st.number_input("최소 시가총액(원)", value=500_000_000_000, step=100_000_000_000)
+    min_cap = st.number_input("최소 시가총액(원)", value=DEFAULT_MIN_MARCAP, step=100_000_000_000)
     st.checkbox("초모바일(아이폰 미니) 모드", key="ultra_mobile")
 
+    poller = snapshot_poller()
+    stream_on = st.toggle("실시간 스트리밍 모드(장중 스냅샷 폴링)", value=poller.running)
+    poller.interval = st.number_input("폴링 주기(초)", min_value=5, max_value=600, value=int(poller.interval), step=5)
+    if stream_on and not poller.running:
+        poller.start(leaderboard_engine())
+    elif not stream_on and poller.running:
+        poller.stop()
+    if poller.updated_at:
+        st.caption(f"마지막 스냅샷 {poller.updated_at:%H:%M:%S} · 폴링 {poller.polls}회 · 변경 {poller.changed_rows}행")
+
+    warmer = cache_warmer()
+    nxt = warmer.next_run()
+    st.caption(
+        (f"캐시 사전 준비 {warmer.last_at:%H:%M:%S} ({sum(warmer.last_took.values()):.0f}초)" if warmer.last_at else "캐시 사전 준비 중…")
+        + (f" · 다음 {nxt:%m-%d %H:%M}" if nxt else "")
+        + (f" · 오류: {warmer.last_error}" if warmer.last_error else "")
+    )
+
     if st.button("현재 테마에 설정 적용", width="stretch"):
-        st.session_state.top_df = build_top(st.session_state.selected_theme, min_marcap=int(min_cap), top_n=int(top_n))
+        load_top(st.session_state.selected_theme, min_marcap=int(min_cap), top_n=int(top_n))
         st.success("설정 반영 완료")
 
+    with st.expander("진단(성능 계측)"):
+        boot = startup_report()
+        if boot:
+            st.caption(f"프로세스 시작: 모듈 import {boot['import_ms']:.0f}ms · 첫 화면 {boot['first_paint_ms']:.0f}ms")
+        snap = METRICS.snapshot()
+        if snap.empty:
+            st.caption("아직 기록된 구간이 없습니다.")
+        else:
+            st.dataframe(snap.round(1), width="stretch", hide_index=True)
+        counters = {**METRICS.counters, **runtime_counters()}
+        if counters:
+            st.dataframe(pd.Series(counters, name="value").rename_axis("counter").reset_index(), width="stretch", hide_index=True)
+        c1, c2, c3 = st.columns(3)
+        c1.download_button("Prometheus 텍스트", METRICS.prometheus(runtime_counters()), file_name="metrics.txt", width="stretch")
+        c2.download_button("JSON", METRICS.to_json(), file_name="metrics.json", width="stretch")
+        if c3.button("초기화", width="stretch"):
+            METRICS.reset()
+            st.rerun()
+
     st.markdown("<p class='small-note'>실시간 HTS(0186/0181/0198) 원천과 1:1 동일하지는 않으며, 공개 데이터 기반 근사 모델입니다.</p>", unsafe_allow_html=True)
     st.markdown("<p class='small-note'>초모바일 모드를 켜면 버튼/폰트/여백이 더 크게 조정됩니다.</p>", unsafe_allow_html=True)
     st.markdown('</div>', unsafe_allow_html=True)
+
+# 프로세스 첫 실행이면 시작 계측 기록, 매 실행 소요 시간은 계측 구간으로
+_finished = time.perf_counter()
+boot = startup_report()
+if not boot:
+    boot.update(import_ms=(_imported - _script_started) * 1000, first_paint_ms=(_finished - _script_started) * 1000)
+METRICS.record("app.script_run", _finished - _script_started)
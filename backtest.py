@@ -0,0 +1,229 @@
+"""주도점수 모델 백테스트.
+
+저장소(data/ohlcv, data/marcap)에 쌓인 거래일 스냅샷을 한 프레임으로 쌓아, 모든 날짜 × 테마의
+순위를 add_leader_scores 한 번으로 계산하고 상위 N 종목의 N일 후 수익률을 측정한다.
+과거 뉴스 신호는 없으므로 관심도/뉴스모멘텀은 0으로 두고 거래대금·등락률 항목만 평가된다.
+시세는 수정주가가 아니므로 액면분할·권리락 등으로 종가가 불연속인 구간은 수익률에서 제외한다.
+
+    python backtest.py --start 20240101 --end 20241231 --backfill
+    python backtest.py --top 3 --horizon 1 5 20
+    python backtest.py --grid-step 10 --processes 4     # 가중치 그리드 탐색
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import pandas as pd
+from streamlit.logger import set_log_level
+
+from market_store import MarketStore, is_finished_day
+from theme_leader import (
+    DEFAULT_MIN_MARCAP,
+    LEADER_WEIGHTS,
+    add_leader_scores,
+    fetch_marcap_snapshot,
+    fetch_ohlcv_snapshot,
+    listing_index,
+    market_store,
+    theme_membership,
+    trading_calendar,
+)
+
+Weights = Tuple[float, float, float, float]
+
+# 전일 종가 대비 변화와 원천 등락률(기준가 대비)의 차이가 이보다 크면 기업 이벤트(분할·병합·권리락)로 본다
+CORP_ACTION_TOL_PCT = 1.0
+# 등락률이 없는 날은 가격제한폭(±30%)을 넘는 종가 변화를 기업 이벤트로 본다
+PRICE_LIMIT_PCT = 30.0
+
+
+def backfill(store: MarketStore, start: str, end: str) -> int:
+    """[start, end] 거래일 중 저장소에 없는 날의 전종목 시세/시총을 받아 저장. 저장한 일수 반환."""
+    cal = trading_calendar()
+    cal.extend_back(start)
+    n = 0
+    for d in cal.days:
+        if not (start <= d <= end) or not is_finished_day(d):
+            continue
+        if not store.has("ohlcv", d):
+            store.write("ohlcv", d, fetch_ohlcv_snapshot(d))
+            n += 1
+        if not store.has("marcap", d):
+            store.write("marcap", d, fetch_marcap_snapshot(d))
+    return n
+
+
+def load_panel(store: MarketStore, start: str = "", end: str = "99999999") -> pd.DataFrame:
+    """저장된 거래일 스냅샷을 (date, Code, close, chg_pct, value, marcap) 롱 프레임으로."""
+    frames = []
+    for d in store.keys("ohlcv"):
+        if not (start <= d <= end):
+            continue
+        o, m = store.read("ohlcv", d), store.read("marcap", d)
+        if o is None or m is None:
+            continue
+        frames.append(o.merge(m, on="Code", how="inner").assign(date=d))
+    if not frames:
+        return pd.DataFrame(columns=["date", "Code", "close", "chg_pct", "value", "marcap"])
+    return pd.concat(frames, ignore_index=True)
+
+
+def corporate_actions(close: pd.DataFrame, chg: pd.DataFrame) -> pd.DataFrame:
+    """(거래일 × 종목) 기업 이벤트 여부. 비수정 종가의 전일 대비 변화가 원천 등락률과 어긋나는 날."""
+    implied = (close / close.shift(1) - 1) * 100
+    return ((implied - chg).abs() > CORP_ACTION_TOL_PCT) | (chg.isna() & (implied.abs() > PRICE_LIMIT_PCT))
+
+
+def forward_returns(panel: pd.DataFrame, horizons: Sequence[int], days: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """(date, Code) 인덱스의 h 거래일 후 수익률(%) 컬럼 fwd_{h}.
+
+    days(거래일 목록)가 있으면 그 위에서 h 를 센다. 저장되지 않은 거래일은 NaN 으로 남아 건너뛰지 않는다.
+    보유 구간에 기업 이벤트가 있는 값은 NaN 으로 제외하고, 이벤트 수는 attrs["corporate_actions"].
+    """
+    close = panel.pivot_table(index="date", columns="Code", values="close", aggfunc="last").sort_index()
+    chg = panel.pivot_table(index="date", columns="Code", values="chg_pct", aggfunc="last")
+    if days is not None:
+        lo, hi = close.index[0], close.index[-1]
+        close = close.reindex(sorted({d for d in days if lo <= d <= hi} | set(close.index)))
+    chg = chg.reindex(index=close.index, columns=close.columns)
+    events = corporate_actions(close, chg).astype(float)
+    out = {}
+    for h in horizons:
+        # t+1..t+h 사이 이벤트 수
+        crossed = events[::-1].rolling(h, min_periods=1).sum()[::-1].shift(-1)
+        ret = (close.shift(-h) / close - 1) * 100
+        out[f"fwd_{h}"] = ret.mask(crossed > 0).stack()
+    res = pd.DataFrame(out).rename_axis(["date", "Code"])
+    res.attrs["corporate_actions"] = int(events.to_numpy().sum())
+    return res
+
+
+def rank_days(
+    panel: pd.DataFrame,
+    membership: pd.DataFrame,
+    weights: Weights = LEADER_WEIGHTS,
+    min_marcap=DEFAULT_MIN_MARCAP,
+) -> pd.DataFrame:
+    """모든 날짜 × 테마 순위를 한 번에 계산 (앱과 같은 add_leader_scores 사용)."""
+    df = membership.merge(panel, on="Code", how="inner")
+    df = df.dropna(subset=["close", "chg_pct", "value"], how="any")
+    df = df[df["marcap"] >= min_marcap].reset_index(drop=True)
+    df["popularity"] = 0.0
+    df["news_momentum"] = 0.0
+    df["news_hits"] = 0
+    df = add_leader_scores(df, by=["date", "theme"], weights=weights)
+    df = df.sort_values(["date", "theme", "leader_score"], ascending=[True, True, False], kind="stable")
+    df["rank"] = df.groupby(["date", "theme"], sort=False).cumcount() + 1
+    return df.reset_index(drop=True)
+
+
+def run_backtest(
+    panel: pd.DataFrame,
+    membership: pd.DataFrame,
+    fwd: pd.DataFrame,
+    top_n: int = 3,
+    weights: Weights = LEADER_WEIGHTS,
+    min_marcap=DEFAULT_MIN_MARCAP,
+) -> pd.DataFrame:
+    """보유기간별 상위 N 평균 수익률, 같은 날 테마 평균 대비 초과수익, 적중률(수익>0), 표본 수."""
+    scored = rank_days(panel, membership, weights, min_marcap).join(fwd, on=["date", "Code"])
+    fwd_cols = list(fwd.columns)
+    theme_avg = scored.groupby(["date", "theme"], sort=False)[fwd_cols].transform("mean")
+    top = scored["rank"] <= top_n
+    rows = []
+    for col in fwd_cols:
+        picks = scored.loc[top, col]
+        valid = picks.notna()
+        rows.append(
+            {
+                "horizon": int(col.split("_")[1]),
+                "top_mean": picks.mean(),
+                "theme_mean": scored[col].mean(),
+                "excess": (picks - theme_avg.loc[top, col]).mean(),
+                "hit_rate": (picks[valid] > 0).mean() if valid.any() else float("nan"),
+                "n": int(valid.sum()),
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def weight_grid(step: int = 10) -> List[Weights]:
+    """합이 100인 (거래대금, 등락률) 가중치 조합. 과거 뉴스 신호가 없어 관심도/뉴스 가중치는 0."""
+    return [(a, 100 - a, 0, 0) for a in range(0, 101, step)]
+
+
+_WORKER: dict = {}
+
+
+def _init_worker(panel, membership, fwd, top_n, min_marcap):
+    # 프로세스당 1회만 큰 프레임을 받아 두고 작업마다 가중치만 전달
+    _WORKER.update(panel=panel, membership=membership, fwd=fwd, top_n=top_n, min_marcap=min_marcap)
+
+
+def _run_weights(weights: Weights) -> pd.DataFrame:
+    w = _WORKER
+    res = run_backtest(w["panel"], w["membership"], w["fwd"], w["top_n"], weights, w["min_marcap"])
+    return res.assign(weights=[weights] * len(res))
+
+
+def sweep(
+    panel: pd.DataFrame,
+    membership: pd.DataFrame,
+    fwd: pd.DataFrame,
+    grid: List[Weights],
+    top_n: int = 3,
+    min_marcap=DEFAULT_MIN_MARCAP,
+    processes: Optional[int] = None,
+) -> pd.DataFrame:
+    """가중치 그리드 탐색. processes>1 이면 프로세스 풀로 병렬 실행."""
+    args = (panel, membership, fwd, top_n, min_marcap)
+    if processes and processes > 1:
+        with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=args) as ex:
+            parts = list(ex.map(_run_weights, grid, chunksize=max(1, len(grid) // (processes * 4))))
+    else:
+        _init_worker(*args)
+        parts = [_run_weights(w) for w in grid]
+    return pd.concat(parts, ignore_index=True)
+
+
+def main(argv=None) -> None:
+    p = argparse.ArgumentParser(description="주도점수 모델 백테스트")
+    p.add_argument("--start", default="", help="시작일 YYYYMMDD")
+    p.add_argument("--end", default="99999999", help="종료일 YYYYMMDD")
+    p.add_argument("--backfill", action="store_true", help="구간 내 저장소에 없는 거래일을 먼저 받아 저장")
+    p.add_argument("--top", type=int, default=3, help="테마별 상위 N")
+    p.add_argument("--horizon", type=int, nargs="+", default=[1, 5, 20], help="보유기간(거래일)")
+    p.add_argument("--min-marcap", type=float, default=DEFAULT_MIN_MARCAP)
+    p.add_argument("--grid-step", type=int, default=0, help="가중치 그리드 간격(0이면 현재 가중치만)")
+    p.add_argument("--processes", type=int, default=1, help="그리드 탐색 프로세스 수")
+    args = p.parse_args(argv)
+
+    set_log_level("error")
+    store = market_store()
+    if args.backfill:
+        print(f"백필: {backfill(store, args.start, args.end)}일 저장")
+
+    panel = load_panel(store, args.start, args.end)
+    if panel.empty:
+        print("저장된 스냅샷이 없습니다. --backfill 로 먼저 받아 주세요.")
+        return
+    membership = theme_membership(listing_index())
+    cal = trading_calendar()
+    cal.extend_back(panel["date"].min())
+    fwd = forward_returns(panel, args.horizon, cal.days)
+    print(
+        f"구간 {panel['date'].min()}~{panel['date'].max()} · {panel['date'].nunique()}거래일 저장"
+        f" · 테마 {membership['theme'].nunique()}개 · 기업 이벤트 {fwd.attrs['corporate_actions']}건 제외"
+    )
+
+    if args.grid_step:
+        res = sweep(panel, membership, fwd, weight_grid(args.grid_step), args.top, args.min_marcap, args.processes)
+        best = res.sort_values("excess", ascending=False).groupby("horizon").head(5)
+        print(best.to_string(index=False))
+    else:
+        print(run_backtest(panel, membership, fwd, args.top, LEADER_WEIGHTS, args.min_marcap).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,515 @@
+"""순위 파이프라인 오프라인 벤치마크.
+
+KRX/네이버를 직접 치지 않고, 기록해 둔 픽스처(종목 목록, 전종목 시세/시총, 거래일, 일봉 이력,
+네이버 검색 HTML)를 로컬 대역(stand-in)으로 제공해 다음 시나리오를 cold/warm 캐시로 측정한다.
+
+- rank_one : 테마 1개 순위(build_top)
+- rank_all : 전 테마 1위 보드(cross_theme_board)
+- infer_all: 상장 전 종목 테마 추정(infer_themes)
+- startup  : (--startup) 저장된 목록만으로 앱을 새로 띄웠을 때 import/첫 화면 시간
+
+지연 p50/p95/최대, 원천별 요청 수, 최대 메모리(tracemalloc)를 보고하고,
+--compare 로 이전 결과 대비 p50 회귀를 검출한다(회귀 시 종료코드 1).
+
+    python bench.py --synthesize bench_fixtures          # 네트워크 없이 합성 픽스처 생성
+    python bench.py --record bench_fixtures              # 실제 원천에서 픽스처 기록
+    python bench.py --fixtures bench_fixtures --save bench.json
+    python bench.py --compare bench.json --tolerance 0.2 --latency-ms 20
+"""
+
+import argparse
+import datetime as dt
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+import requests
+import streamlit as st
+from streamlit.logger import set_log_level
+
+from coalesce import clear_caches
+from market_store import MarketStore, now_kst
+
+DEFAULT_FIXTURES = "bench_fixtures"
+HIST_RECORD_DAYS = 400
+
+
+def _news_key(url: str) -> str:
+    return hashlib.sha1(url.encode()).hexdigest()
+
+
+# --------------------------
+# 로컬 대역
+# --------------------------
+class FixtureSource:
+    """픽스처 저장소 + 원천별 요청 카운터. latency 초만큼 요청마다 지연을 흉내낸다."""
+
+    def __init__(self, root: str, latency: float = 0.0):
+        self.root = root
+        self.store = MarketStore(root)
+        self.latency = latency
+        with open(os.path.join(root, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def hit(self, source: str) -> None:
+        with self._lock:
+            self.counts[source] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def take_counts(self) -> Dict[str, int]:
+        with self._lock:
+            out = dict(self.counts)
+            self.counts.clear()
+        return out
+
+
+class FixtureFDR:
+    def __init__(self, src: FixtureSource):
+        self.src = src
+
+    def StockListing(self, market: str) -> pd.DataFrame:
+        self.src.hit("listing")
+        return self.src.store.read("listing", "krx")
+
+    def DataReader(self, symbol: str, start=None, end=None) -> pd.DataFrame:
+        self.src.hit("hist")
+        if symbol == "KS11":
+            days = pd.to_datetime(self.src.store.read("calendar", "krx")["date"])
+            h = pd.DataFrame({"Close": 0.0}, index=pd.DatetimeIndex(days, name="Date"))
+        else:
+            h = self.src.store.read("hist", symbol)
+            if h is None:
+                return pd.DataFrame()
+        lo = pd.Timestamp(start) if start else h.index.min()
+        hi = pd.Timestamp(end) if end else h.index.max()
+        return h[(h.index >= lo) & (h.index <= hi)]
+
+
+class FixtureKRX:
+    """pykrx.stock 대역. 날짜와 무관하게 기록된 거래일 스냅샷을 돌려준다."""
+
+    def __init__(self, src: FixtureSource):
+        self.src = src
+
+    def get_market_ohlcv_by_ticker(self, date, market="ALL") -> pd.DataFrame:
+        self.src.hit("ohlcv")
+        return self.src.store.read("ohlcv", "raw").set_index("티커")
+
+    def get_market_cap_by_ticker(self, date, market="ALL") -> pd.DataFrame:
+        self.src.hit("marcap")
+        return self.src.store.read("marcap", "raw").set_index("티커")
+
+    def get_previous_business_days(self, fromdate: str, todate: str) -> List[pd.Timestamp]:
+        self.src.hit("calendar")
+        days = self.src.store.read("calendar", "krx")["date"]
+        return [pd.Timestamp(d) for d in days if fromdate <= d <= todate]
+
+
+class FixtureSession:
+    """requests.Session 대역. 기록 안 된 검색어는 결과 없는 페이지를 돌려준다."""
+
+    def __init__(self, src: FixtureSource):
+        self.src = src
+        self.headers: Dict[str, str] = {}
+
+    def mount(self, *args) -> None:
+        pass
+
+    def get(self, url: str, timeout=None, **kwargs) -> requests.Response:
+        self.src.hit("news")
+        path = os.path.join(self.src.root, "news", _news_key(url) + ".html")
+        try:
+            with open(path, "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            body = b"<html><body><div class='group_news'></div></body></html>"
+        r = requests.Response()
+        r.status_code = 200
+        r._content = body
+        r.encoding = "utf-8"
+        r.url = url
+        return r
+
+
+# --------------------------
+# 픽스처 생성
+# --------------------------
+def _write_meta(root: str, **meta) -> None:
+    with open(os.path.join(root, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+
+def _news_html(titles: List[str]) -> str:
+    items = "".join(
+        f"<div class='news_area'><div class='news_info'><span class='info'>{i + 1}시간 전</span></div>"
+        f"<a class='news_tit' href='https://news.example.com/{i}' title='{t}'>{t}</a></div>"
+        for i, t in enumerate(titles)
+    )
+    return f"<html><body><div class='group_news'>{items}</div></body></html>"
+
+
+def synthesize(root: str, n_stocks: int = 2500, seed: int = 0) -> None:
+    """테마 사전 종목 + 임의 종목으로 결정적인 합성 픽스처를 만든다."""
+    from theme_leader import _naver_news_url, theme_dictionary
+
+    themes = theme_dictionary()
+
+    rng = np.random.default_rng(seed)
+    store = MarketStore(root)
+    members = list(dict.fromkeys(n for arr in themes.theme_map.values() for n in arr))
+    names = members + [f"종목{i:04d}" for i in range(max(0, n_stocks - len(members)))]
+    codes = [f"{i + 1:06d}" for i in range(len(names))]
+    words = [w for ws in themes.theme_keywords.values() for w in ws] + ["유통", "건설", "식품", "금융", "화학", "소프트웨어"]
+    listing = pd.DataFrame(
+        {
+            "Code": codes,
+            "Name": names,
+            "Market": rng.choice(["KOSPI", "KOSDAQ"], len(names)),
+            "Sector": rng.choice(words, len(names)),
+            "Industry": [" ".join(rng.choice(words, 2)) for _ in names],
+            "Marcap": rng.lognormal(26, 1.5, len(names)).round(),
+        }
+    )
+    store.write("listing", "krx", listing)
+
+    end = now_kst().date() - dt.timedelta(days=1)
+    days = pd.bdate_range(end=end, periods=HIST_RECORD_DAYS)
+    store.write("calendar", "krx", pd.DataFrame({"date": days.strftime("%Y%m%d")}))
+
+    close = rng.lognormal(10, 1, len(names)).round()
+    store.write(
+        "ohlcv",
+        "raw",
+        pd.DataFrame(
+            {
+                "티커": codes,
+                "시가": close,
+                "고가": close,
+                "저가": close,
+                "종가": close,
+                "거래량": rng.integers(1_000, 5_000_000, len(names)),
+                "거래대금": rng.lognormal(22, 2, len(names)).round(),
+                "등락률": rng.normal(0, 3, len(names)).round(2),
+            }
+        ),
+    )
+    store.write("marcap", "raw", pd.DataFrame({"티커": codes, "시가총액": listing["Marcap"]}))
+
+    for name, code in zip(members, codes):
+        c = 10_000 * np.exp(np.cumsum(rng.normal(0, 0.02, len(days))))
+        store.write(
+            "hist",
+            code,
+            pd.DataFrame(
+                {"Open": c, "High": c * 1.01, "Low": c * 0.99, "Close": c, "Volume": rng.integers(1_000, 1_000_000, len(days)), "Change": 0.0},
+                index=pd.DatetimeIndex(days, name="Date"),
+            ),
+        )
+
+    news = os.path.join(root, "news")
+    os.makedirs(news, exist_ok=True)
+    for name in names[: len(members) + 200]:
+        for q in (name, f"{name} 특징주"):
+            titles = [f"{name} {rng.choice(words)} 관련 기사 {i}" for i in range(int(rng.integers(0, 30)))]
+            with open(os.path.join(news, _news_key(_naver_news_url(q)) + ".html"), "w", encoding="utf-8") as f:
+                f.write(_news_html(titles))
+    _write_meta(root, kind="synthetic", seed=seed, stocks=len(names), created=dt.datetime.now().isoformat(timespec="seconds"))
+
+
+def record(root: str, infer_sample: int = 200) -> None:
+    """실제 원천(FDR/pykrx/네이버)에서 픽스처를 기록. 테마 종목 전부 + 추정용 표본 infer_sample개의 뉴스."""
+    import FinanceDataReader as fdr
+    from pykrx import stock
+
+    from theme_leader import _naver_news_url, latest_bday_str, scrape_client, theme_dictionary
+
+    store = MarketStore(root)
+    listing = fdr.StockListing("KRX")
+    listing["Code"] = listing["Code"].astype(str).str.zfill(6)
+    store.write("listing", "krx", listing)
+
+    ds = latest_bday_str()
+    start = (dt.datetime.strptime(ds, "%Y%m%d") - dt.timedelta(days=HIST_RECORD_DAYS * 7 // 5)).strftime("%Y%m%d")
+    days = stock.get_previous_business_days(fromdate=start, todate=ds)
+    store.write("calendar", "krx", pd.DataFrame({"date": [d.strftime("%Y%m%d") for d in days]}))
+    store.write("ohlcv", "raw", stock.get_market_ohlcv_by_ticker(ds, market="ALL").rename_axis("티커").reset_index())
+    store.write("marcap", "raw", stock.get_market_cap_by_ticker(ds, market="ALL").rename_axis("티커").reset_index())
+
+    by_name = dict(zip(listing["Name"], listing["Code"]))
+    members = [n for n in dict.fromkeys(n for arr in theme_dictionary().theme_map.values() for n in arr) if n in by_name]
+    for n in members:
+        store.write("hist", by_name[n], fdr.DataReader(by_name[n], start, ds))
+
+    news = os.path.join(root, "news")
+    os.makedirs(news, exist_ok=True)
+    sample = [n for n in listing["Name"] if n not in set(members)][:infer_sample]
+    queries = [q for n in members for q in (n, f"{n} 특징주")] + sample
+    client = scrape_client()
+    for q in queries:
+        url = _naver_news_url(q)
+        try:
+            body = client.get(url).text
+        except requests.RequestException as e:
+            print(f"기록 실패({q}): {e}", file=sys.stderr)
+            continue
+        with open(os.path.join(news, _news_key(url) + ".html"), "w", encoding="utf-8") as f:
+            f.write(body)
+    _write_meta(root, kind="recorded", date=ds, stocks=len(listing), created=dt.datetime.now().isoformat(timespec="seconds"))
+
+
+# --------------------------
+# 실행기
+# --------------------------
+class Bench:
+    """theme_leader 의 원천(fdr/pykrx/네이버)과 디스크 저장소를 대역/임시 디렉터리로 바꿔 측정한다.
+
+    저장소는 벤치가 직접 만든 임시 디렉터리만 쓰며, 실제 data/ 는 건드리지 않는다.
+    """
+
+    def __init__(self, src: FixtureSource, throttle: bool = False):
+        import theme_leader as tl
+
+        self.tl = tl
+        self.src = src
+        self.throttle = throttle
+        self.root = tempfile.mkdtemp(prefix="bench-store-")
+        store = MarketStore(self.root)
+        tl.market_store = lambda: store
+        tl.fdr = FixtureFDR(src)
+        tl.stock = FixtureKRX(src)
+
+    def _install_client(self) -> None:
+        client = self.tl.scrape_client()
+        if not isinstance(client.session, FixtureSession):
+            client.session = FixtureSession(self.src)
+            if not self.throttle:
+                client.bucket = self.tl.TokenBucket(rate=1e9, burst=10**9)
+
+    def reset(self) -> None:
+        """cold 상태: 메모리 캐시 + 디스크 저장소를 모두 비운다."""
+        for pool in (self.tl._news_pool(), self.tl._fetch_pool()):
+            pool.shutdown(wait=False, cancel_futures=True)
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        clear_caches()
+        root = self.tl.market_store().root
+        if os.path.realpath(root) != os.path.realpath(self.root):
+            raise RuntimeError(f"벤치가 만든 저장소가 아닙니다: {root}")
+        shutil.rmtree(root, ignore_errors=True)
+        os.makedirs(root, exist_ok=True)
+        self._install_client()
+
+    def close(self) -> None:
+        """벤치 임시 저장소 삭제."""
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def scenarios(self, theme: str) -> Dict[str, Callable[[], object]]:
+        tl = self.tl
+
+        def rank_all():
+            tl._cross_theme_board.clear()  # 보드 캐시만 비우고 하위 조회 캐시는 유지
+            return tl.cross_theme_board()
+
+        def infer_all():
+            idx = tl.listing_index()
+            return [tl.infer_themes(n, idx) for n in idx.names]
+
+        return {"rank_one": lambda: tl.build_top(theme), "rank_all": rank_all, "infer_all": infer_all}
+
+    def _run_once(self, fn: Callable, cold: bool, trace: bool = False) -> Dict:
+        if cold:
+            self.reset()
+        self.src.take_counts()
+        if trace:
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        fn()
+        sec = time.perf_counter() - t0
+        peak = 0
+        if trace:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return {"sec": sec, "requests": self.src.take_counts(), "peak": peak}
+
+    def measure(self, name: str, fn: Callable, cold: bool, repeat: int) -> Dict:
+        if not cold:
+            self._run_once(fn, cold=False)  # 캐시 예열
+        runs = [self._run_once(fn, cold) for _ in range(repeat)]
+        # tracemalloc 은 느리므로 지연 측정과 분리해 1회만
+        peak = self._run_once(fn, cold, trace=True)["peak"]
+        secs = np.array([r["sec"] for r in runs]) * 1000
+        reqs = Counter()
+        for r in runs:
+            reqs.update(r["requests"])
+        return {
+            "scenario": name,
+            "cache": "cold" if cold else "warm",
+            "runs": repeat,
+            "p50_ms": float(np.percentile(secs, 50)),
+            "p95_ms": float(np.percentile(secs, 95)),
+            "max_ms": float(secs.max()),
+            "requests": {k: v / repeat for k, v in sorted(reqs.items())},
+            "peak_mb": peak / 2**20,
+        }
+
+
+HEAVY_MODULES = ("pykrx", "FinanceDataReader", "plotly", "bs4", "lxml")
+
+# 새 프로세스에서 실행: theme_leader import 시간, AppTest 첫 화면 시간, 그 시점까지 로드된 무거운 모듈
+STARTUP_PROBE = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+t0 = time.perf_counter()
+import theme_leader
+t1 = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=120).run()
+t2 = time.perf_counter()
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "first_paint_ms": (t2 - t1) * 1000,
+    "heavy_loaded": [m for m in sys.argv[2:] if m in sys.modules],
+    "exceptions": len(at.exception),
+}))
+"""
+
+
+def measure_startup(fixtures: str, runs: int = 3) -> Dict:
+    """저장된 목록 스냅샷만 있는 새 저장소로 앱을 runs 번 새로 띄워 import/첫 화면 시간을 잰다."""
+    app = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+    listing = MarketStore(fixtures).read("listing", "krx")
+    samples = []
+    for _ in range(runs):
+        root = tempfile.mkdtemp(prefix="bench-startup-")
+        MarketStore(root).write("listing", now_kst().strftime("%Y%m%d"), listing)
+        env = {**os.environ, "THEME_LEADER_DATA_DIR": root}
+        out = subprocess.run(
+            [sys.executable, "-c", STARTUP_PROBE, app, *HEAVY_MODULES],
+            cwd=os.path.dirname(app),
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=300,
+        )
+        shutil.rmtree(root, ignore_errors=True)
+        lines = [l for l in out.stdout.splitlines() if l.startswith("{")]
+        if not lines:
+            raise RuntimeError(f"시작 측정 실패: {out.stderr[-500:]}")
+        samples.append(json.loads(lines[-1]))
+    imp = np.array([s["import_ms"] for s in samples])
+    paint = np.array([s["first_paint_ms"] for s in samples])
+    return {
+        "scenario": "startup",
+        "cache": "cold",
+        "runs": runs,
+        "p50_ms": float(np.percentile(imp + paint, 50)),
+        "p95_ms": float(np.percentile(imp + paint, 95)),
+        "max_ms": float((imp + paint).max()),
+        "requests": {},
+        "peak_mb": 0.0,
+        "import_ms": float(np.median(imp)),
+        "first_paint_ms": float(np.median(paint)),
+        "heavy_loaded": sorted({m for s in samples for m in s["heavy_loaded"]}),
+        "exceptions": sum(s["exceptions"] for s in samples),
+    }
+
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[str]:
+    """p50 이 baseline 대비 tolerance 비율 넘게 느려진 항목."""
+    base = {(r["scenario"], r["cache"]): r for r in baseline}
+    out = []
+    for r in results:
+        b = base.get((r["scenario"], r["cache"]))
+        if b and b["p50_ms"] > 0 and r["p50_ms"] > b["p50_ms"] * (1 + tolerance):
+            out.append(f"{r['scenario']}/{r['cache']}: p50 {b['p50_ms']:.1f} → {r['p50_ms']:.1f}ms")
+        if b and sum(r["requests"].values()) > sum(b["requests"].values()):
+            out.append(f"{r['scenario']}/{r['cache']}: 요청 수 {sum(b['requests'].values()):.0f} → {sum(r['requests'].values()):.0f}")
+    return out
+
+
+def main(argv=None) -> None:
+    p = argparse.ArgumentParser(description="순위 파이프라인 오프라인 벤치마크")
+    p.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="픽스처 디렉터리")
+    p.add_argument("--synthesize", metavar="DIR", help="합성 픽스처를 DIR 에 만들고 종료")
+    p.add_argument("--stocks", type=int, default=2500, help="합성 픽스처 종목 수")
+    p.add_argument("--record", metavar="DIR", help="실제 원천에서 픽스처를 DIR 에 기록하고 종료")
+    p.add_argument("--infer-sample", type=int, default=200, help="기록할 추정용 종목 뉴스 수")
+    p.add_argument("--scenario", nargs="+", default=["rank_one", "rank_all", "infer_all"])
+    p.add_argument("--theme", default="반도체", help="rank_one 대상 테마")
+    p.add_argument("--repeat", type=int, default=20, help="warm 반복 횟수")
+    p.add_argument("--cold-repeat", type=int, default=3, help="cold 반복 횟수")
+    p.add_argument("--latency-ms", type=float, default=0.0, help="대역 요청당 흉내낼 네트워크 지연")
+    p.add_argument("--throttle", action="store_true", help="스크래핑 레이트리밋을 운영값 그대로 적용")
+    p.add_argument("--spans", action="store_true", help="구간별 계측(metrics) 표도 출력")
+    p.add_argument("--startup", action="store_true", help="앱 import/첫 화면 시간도 측정(새 프로세스)")
+    p.add_argument("--save", help="결과 JSON 저장 경로")
+    p.add_argument("--compare", help="이전 결과 JSON 과 비교")
+    p.add_argument("--tolerance", type=float, default=0.2, help="p50 회귀 허용 비율")
+    args = p.parse_args(argv)
+
+    set_log_level("error")
+    if args.synthesize:
+        synthesize(args.synthesize, args.stocks)
+        print(f"합성 픽스처 생성: {args.synthesize}")
+        return
+    if args.record:
+        record(args.record, args.infer_sample)
+        print(f"픽스처 기록: {args.record}")
+        return
+
+    src = FixtureSource(args.fixtures, latency=args.latency_ms / 1000)
+    bench = Bench(src, throttle=args.throttle)
+    scenarios = bench.scenarios(args.theme)
+
+    results = []
+    try:
+        for name in args.scenario:
+            for cold in (True, False):
+                results.append(bench.measure(name, scenarios[name], cold, args.cold_repeat if cold else args.repeat))
+    finally:
+        bench.close()
+    if args.startup:
+        results.append(measure_startup(args.fixtures, args.cold_repeat))
+
+    table = pd.DataFrame(results)[["scenario", "cache", "runs", "p50_ms", "p95_ms", "max_ms", "requests", "peak_mb"]]
+    table["requests"] = table["requests"].map(lambda d: " ".join(f"{k}={v:g}" for k, v in d.items()) or "-")
+    print(f"픽스처 {args.fixtures} ({src.meta.get('kind')}) · 요청 지연 {args.latency_ms:g}ms")
+    print(table.round(2).to_string(index=False))
+    for r in results:
+        if r["scenario"] == "startup":
+            print(
+                f"시작: import {r['import_ms']:.0f}ms + 첫 화면 {r['first_paint_ms']:.0f}ms · "
+                f"첫 화면까지 로드된 무거운 모듈: {', '.join(r['heavy_loaded']) or '없음'} · 예외 {r['exceptions']}"
+            )
+    if args.spans:
+        from metrics import METRICS
+
+        print(METRICS.snapshot().round(2).to_string(index=False))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"회귀: {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
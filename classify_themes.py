@@ -0,0 +1,44 @@
+"""전 종목 테마 분류 배치.
+
+상장 전 종목을 infer_themes와 같은 점수로 분류해 저장소(data/themes/YYYYMMDD.arrow)에 기록한다.
+앱은 시작 시 이 결과를 읽어 테마 사전(themes.json) 밖 종목도 조회만으로 테마를 답한다.
+
+    python classify_themes.py               # 1회 실행
+    python classify_themes.py --every 360   # 360분마다 반복 (또는 cron 등록)
+"""
+
+import argparse
+import time
+
+from streamlit.logger import set_log_level
+
+from theme_leader import classify_universe, listing_index, save_theme_index
+
+
+def run_once(use_news: bool, budget: float) -> None:
+    started = time.monotonic()
+    index = listing_index()
+    df = classify_universe(index, use_news=use_news, budget=budget or None)
+    path = save_theme_index(df)
+    tagged = df.loc[df["theme"] != "", "Name"].nunique()
+    print(f"분류 완료: {df['Name'].nunique()}종목 중 {tagged}종목 테마 부여 ({time.monotonic() - started:.1f}s) → {path}")
+
+
+def main(argv=None) -> None:
+    p = argparse.ArgumentParser(description="KRX 전 종목 테마 분류 배치")
+    p.add_argument("--no-news", action="store_true", help="뉴스 검색 없이 업종/섹터 키워드만으로 분류")
+    p.add_argument("--budget", type=float, default=0, help="뉴스 수집 총 예산(초, 0이면 무제한)")
+    p.add_argument("--every", type=float, default=0, help="반복 주기(분, 0이면 1회 실행)")
+    args = p.parse_args(argv)
+
+    # 헤드리스 실행 시 Streamlit 캐시의 런타임 경고 숨김
+    set_log_level("error")
+    while True:
+        run_once(not args.no_news, args.budget)
+        if not args.every:
+            break
+        time.sleep(args.every * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""요청 합치기(single-flight) + stale-while-revalidate 캐시.
+
+같은 키를 동시에 여러 세션이 요청하면 원천 호출은 1건만 실행하고 나머지는 그 결과를 기다린다.
+TTL 이 지난 값도 stale 구간 안이면 즉시 돌려주고, 백그라운드에서 1건만 다시 받아 교체한다.
+
+    @swr_cache(ttl=600, stale=1800)
+    def fetch(key): ...
+
+반환값은 복사 없이 모든 호출자가 공유하므로 호출부는 수정하지 않는다.
+"""
+
+import functools
+import inspect
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+
+from metrics import METRICS
+
+REFRESH_WORKERS = 4
+
+_refresh_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+_caches: "weakref.WeakSet[SWRCache]" = weakref.WeakSet()
+
+
+def refresh_pool() -> ThreadPoolExecutor:
+    global _refresh_pool
+    with _pool_lock:
+        if _refresh_pool is None:
+            _refresh_pool = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix="swr")
+        return _refresh_pool
+
+
+class SingleFlight:
+    """키별로 진행 중인 호출을 1개로 합친다. 실패도 기다리던 호출자 모두에게 그대로 전달."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._calls[key] = fut
+        if not leader:
+            return fut.result()
+        try:
+            fut.set_result(fn())
+        except BaseException as e:
+            fut.set_exception(e)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+        return fut.result()
+
+
+class SWRCache:
+    def __init__(self, fn: Callable, ttl: float, stale: float = 0.0, max_entries: Optional[int] = None):
+        self.fn = fn
+        self.name = fn.__name__
+        self.ttl = ttl
+        self.stale = stale
+        self.max_entries = max_entries
+        self.flight = SingleFlight()
+        self._sig = inspect.signature(fn)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._refreshing: Set[Hashable] = set()
+        self._lock = threading.Lock()
+        _caches.add(self)
+
+    def _key(self, args, kwargs) -> Hashable:
+        # 기본값을 채워 fetch(x) 와 fetch(x, 기본값) 을 같은 키로
+        bound = self._sig.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return tuple(bound.arguments.items())
+
+    def get(self, *args, **kwargs) -> Any:
+        key = self._key(args, kwargs)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.monotonic() - stored_at
+            if age < self.ttl:
+                return value
+            if age < self.ttl + self.stale:
+                METRICS.inc(f"{self.name}_stale_served")
+                self._revalidate(key, args, kwargs)
+                return value
+        return self.flight.do(key, lambda: self._load(key, args, kwargs))
+
+    def _load(self, key, args, kwargs) -> Any:
+        value = self.fn(*args, **kwargs)
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while self.max_entries and len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def _revalidate(self, key, args, kwargs) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self.flight.do(key, lambda: self._load(key, args, kwargs))
+            except Exception:
+                # 실패하면 이전 값을 유지하고 다음 조회 때 다시 시도
+                METRICS.inc(f"{self.name}_revalidate_errors")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        refresh_pool().submit(run)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def swr_cache(ttl: float, stale: float = 0.0, max_entries: Optional[int] = None):
+    """single-flight + stale-while-revalidate 메모리 캐시 데코레이터. ttl/stale 은 초."""
+
+    def deco(fn):
+        cache = SWRCache(fn, ttl, stale, max_entries)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return cache.get(*args, **kwargs)
+
+        wrapper.clear = cache.clear
+        wrapper.cache = cache
+        return wrapper
+
+    return deco
+
+
+def clear_caches() -> None:
+    """모든 swr_cache 비우기 (st.cache_data.clear() 대응)."""
+    for cache in list(_caches):
+        cache.clear()
@@ -0,0 +1,36 @@
+"""무거운 라이브러리 지연 import.
+
+    fdr = LazyModule("FinanceDataReader")
+    fdr.DataReader(...)  # 첫 속성 접근 때 import. 소요 시간은 METRICS 'import.FinanceDataReader' 구간
+
+앱 시작/첫 화면은 이 모듈들을 건드리지 않으므로 차트·스크래핑·pykrx 경로가 실제로 실행될 때만 비용을 낸다.
+"""
+
+import importlib
+import threading
+from types import ModuleType
+from typing import Optional
+
+from metrics import METRICS
+
+
+class LazyModule:
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    with METRICS.span(f"import.{self._name}"):
+                        self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name} ({state})>"
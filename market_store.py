@@ -0,0 +1,114 @@
+"""거래일 단위 로컬 시세 저장소 (Arrow IPC 파일).
+
+- 종류(kind)별 디렉터리에 거래일(YYYYMMDD) 키로 1파일씩 저장한다.
+- 장 마감이 끝난 거래일 파일은 불변: 한 번 쓰면 다시 받지 않는다.
+- 쓰기는 임시파일 → os.replace 로 원자적이므로 여러 프로세스가 동시에 읽어도 안전하다.
+- 읽기는 memory-map 으로 열고 컬럼을 블록으로 합치지 않고 변환해, 결측 없는 숫자 컬럼은 복사 없이
+  파일 페이지(페이지 캐시)를 그대로 가리킨다. 이런 컬럼은 읽기 전용이므로 호출부는 새 프레임을 만들어 쓴다.
+  문자열/결측 포함 컬럼은 변환 시 복사된다.
+"""
+
+import os
+import datetime as dt
+import tempfile
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+import pyarrow as pa
+
+KST = ZoneInfo("Asia/Seoul")
+MARKET_OPEN = dt.time(9, 0)
+MARKET_CLOSE = dt.time(15, 40)  # 종가 확정(동시호가 + 여유)
+DEFAULT_ROOT = os.environ.get("THEME_LEADER_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+
+
+def now_kst() -> dt.datetime:
+    return dt.datetime.now(KST)
+
+
+def is_finished_day(date_str: str, now: Optional[dt.datetime] = None) -> bool:
+    """date_str(YYYYMMDD) 장이 마감되어 데이터가 더 이상 바뀌지 않는지."""
+    now = now or now_kst()
+    today = now.strftime("%Y%m%d")
+    if date_str < today:
+        return True
+    return date_str == today and now.time() >= MARKET_CLOSE
+
+
+def in_session(now: Optional[dt.datetime] = None) -> bool:
+    """평일 장중(개장~종가 확정 전) 여부. 휴장일은 구분하지 않는다."""
+    now = now or now_kst()
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def last_close(now: Optional[dt.datetime] = None) -> dt.datetime:
+    """now 이전 가장 최근 평일 종가 확정 시각."""
+    now = now or now_kst()
+    d = now.date() if now.time() >= MARKET_CLOSE else now.date() - dt.timedelta(days=1)
+    while d.weekday() >= 5:
+        d -= dt.timedelta(days=1)
+    return dt.datetime.combine(d, MARKET_CLOSE, tzinfo=KST)
+
+
+class MarketStore:
+    def __init__(self, root: str = DEFAULT_ROOT):
+        self.root = root
+
+    def path(self, kind: str, key: str) -> str:
+        return os.path.join(self.root, kind, f"{key}.arrow")
+
+    def has(self, kind: str, key: str) -> bool:
+        return os.path.exists(self.path(kind, key))
+
+    def keys(self, kind: str) -> List[str]:
+        d = os.path.join(self.root, kind)
+        if not os.path.isdir(d):
+            return []
+        return sorted(f[:-6] for f in os.listdir(d) if f.endswith(".arrow"))
+
+    def is_fresh(self, kind: str, key: str, now: Optional[dt.datetime] = None) -> bool:
+        """마지막 종가 확정 이후에 쓰인 파일인지(= 그 뒤로 새 일봉이 생기지 않았는지)."""
+        try:
+            mtime = os.path.getmtime(self.path(kind, key))
+        except OSError:
+            return False
+        return mtime >= last_close(now).timestamp()
+
+    def latest_key(self, kind: str) -> Optional[str]:
+        ks = self.keys(kind)
+        return ks[-1] if ks else None
+
+    def read_table(self, kind: str, key: str) -> Optional[pa.Table]:
+        p = self.path(kind, key)
+        try:
+            with pa.memory_map(p, "r") as src:
+                return pa.ipc.open_file(src).read_all()
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return None
+
+    def read(self, kind: str, key: str) -> Optional[pd.DataFrame]:
+        t = self.read_table(kind, key)
+        return None if t is None else t.to_pandas(split_blocks=True, self_destruct=True)
+
+    def read_meta(self, kind: str, key: str) -> Dict[str, str]:
+        t = self.read_table(kind, key)
+        if t is None or not t.schema.metadata:
+            return {}
+        return {k.decode(): v.decode() for k, v in t.schema.metadata.items() if not k.startswith(b"pandas")}
+
+    def write(self, kind: str, key: str, df: pd.DataFrame, meta: Optional[Dict[str, str]] = None) -> None:
+        d = os.path.join(self.root, kind)
+        os.makedirs(d, exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=not isinstance(df.index, pd.RangeIndex))
+        if meta:
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), **{k.encode(): v.encode() for k, v in meta.items()}})
+        fd, tmp = tempfile.mkstemp(dir=d, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f, pa.ipc.new_file(f, table.schema) as w:
+                w.write_table(table)
+            os.replace(tmp, self.path(kind, key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
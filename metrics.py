@@ -0,0 +1,178 @@
+"""핫패스 계측: 구간 타이밍 + 캐시 히트/미스 카운터.
+
+    @timed("fetch_hist")                 # 호출 전체(캐시 히트 포함)
+    @st.cache_data(ttl=600)
+    @timed("fetch_hist", miss=True)      # 캐시 미스일 때만 실행되는 본문
+
+두 번 감싼 함수는 (전체 호출 - 미스) 로 캐시 히트 수를 계산한다.
+결과는 표(snapshot), JSON 로그(logger "theme_leader.metrics", DEBUG), Prometheus 텍스트로 내보낸다.
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, List
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("theme_leader.metrics")
+
+MISS_SUFFIX = ":miss"
+SAMPLE_SIZE = 512
+
+
+class SpanStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        self.samples: Deque[float] = deque(maxlen=SAMPLE_SIZE)
+
+    def add(self, sec: float, ok: bool) -> None:
+        self.count += 1
+        self.errors += 0 if ok else 1
+        self.total += sec
+        self.max = max(self.max, sec)
+        self.last = sec
+        self.samples.append(sec)
+
+
+class Metrics:
+    def __init__(self):
+        self.spans: Dict[str, SpanStats] = {}
+        self.counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, sec: float, ok: bool = True) -> None:
+        with self._lock:
+            self.spans.setdefault(name, SpanStats()).add(sec, ok)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps({"span": name, "ms": round(sec * 1000, 2), "ok": ok, "ts": time.time()}))
+
+    def inc(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def span(self, name: str):
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record(name, time.perf_counter() - t0, ok)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+
+    def snapshot(self) -> pd.DataFrame:
+        """구간별 호출 수 / 평균·p50·p95·최대 ms / 캐시 히트·미스."""
+        with self._lock:
+            items = {k: (v.count, v.errors, v.total, v.max, list(v.samples)) for k, v in self.spans.items()}
+        rows = []
+        for name, (count, errors, total, mx, samples) in sorted(items.items()):
+            if name.endswith(MISS_SUFFIX):
+                continue
+            miss = items.get(name + MISS_SUFFIX)
+            p50, p95 = np.percentile(samples, [50, 95]) if samples else (0.0, 0.0)
+            rows.append(
+                {
+                    "span": name,
+                    "calls": count,
+                    "errors": errors,
+                    "mean_ms": total / count * 1000 if count else 0.0,
+                    "p50_ms": p50 * 1000,
+                    "p95_ms": p95 * 1000,
+                    "max_ms": mx * 1000,
+                    "cache_hits": count - miss[0] if miss else None,
+                    "cache_misses": miss[0] if miss else None,
+                }
+            )
+        return pd.DataFrame(rows)
+
+    def to_json(self) -> str:
+        snap = self.snapshot()
+        with self._lock:
+            counters = dict(self.counters)
+        return json.dumps({"spans": snap.to_dict("records"), "counters": counters}, ensure_ascii=False, default=float)
+
+    def prometheus(self, extra: Dict[str, float] = None) -> str:
+        """Prometheus 텍스트 노출 형식."""
+        lines: List[str] = [
+            "# TYPE theme_leader_span_seconds summary",
+        ]
+        with self._lock:
+            items = {k: (v.count, v.total, list(v.samples)) for k, v in self.spans.items()}
+            counters = {**self.counters, **(extra or {})}
+        for name, (count, total, samples) in sorted(items.items()):
+            base, _, miss = name.partition(":")
+            label = f'span="{base}"' + (',phase="miss"' if miss else "")
+            for q in (0.5, 0.95):
+                v = float(np.quantile(samples, q)) if samples else 0.0
+                lines.append(f'theme_leader_span_seconds{{{label},quantile="{q}"}} {v:.6f}')
+            lines.append(f"theme_leader_span_seconds_sum{{{label}}} {total:.6f}")
+            lines.append(f"theme_leader_span_seconds_count{{{label}}} {count}")
+        if counters:
+            lines.append("# TYPE theme_leader_counter counter")
+            for name, v in sorted(counters.items()):
+                lines.append(f'theme_leader_counter{{name="{name}"}} {v}')
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Metrics()
+
+
+def timed(name: str, miss: bool = False):
+    """함수 호출 시간을 name 구간으로 기록. miss=True 는 캐시 데코레이터 안쪽(미스 경로)용."""
+    span_name = name + MISS_SUFFIX if miss else name
+
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with METRICS.span(span_name):
+                return fn(*args, **kwargs)
+
+        # st.cache_data 래퍼의 clear() 등을 그대로 노출
+        if hasattr(fn, "clear"):
+            wrapper.clear = fn.clear
+        return wrapper
+
+    return deco
+
+
+def serve_prometheus(port: int, extra=None) -> ThreadingHTTPServer:
+    """/metrics 로 Prometheus 텍스트를 내보내는 백그라운드 HTTP 서버. extra 는 추가 카운터를 돌려주는 함수."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = METRICS.prometheus(extra() if extra else None).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+METRICS_PORT = int(os.environ.get("THEME_LEADER_METRICS_PORT", "0") or 0)
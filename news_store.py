@@ -0,0 +1,149 @@
+"""종목별 뉴스 헤드라인 로컬 저장소 (SQLite).
+
+- 스크랩한 (제목, 링크, 시각)을 종목·검색 종류(kind)별로 누적한다.
+- 같은 기사는 링크 해시 또는 정규화한 제목 해시가 같으면 한 번만 저장한다(재전송/중복 게재 제외).
+- 검색별 마지막 수집 시각을 함께 두어, 호출부가 오래된 검색만 다시 받도록 한다.
+- 신호(최근 N시간 건수, 시간 감쇠 합)는 (kind, published, name) 인덱스 범위 조회로 계산한다.
+- WAL 모드라 앱과 알림 데몬 등 여러 프로세스가 같은 파일을 동시에 읽고 쓸 수 있다.
+"""
+
+import datetime as dt
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 오래된 헤드라인 정리 주기/보관 기간
+PRUNE_EVERY_SEC = 60 * 60
+RETENTION_DAYS = 30
+# 한 쿼리에 넣는 종목명 수 (SQLite 바인딩 변수 상한 999 이하)
+NAMES_PER_QUERY = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS headlines (
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    title_hash TEXT NOT NULL,
+    url_hash TEXT,
+    title TEXT NOT NULL,
+    link TEXT,
+    published REAL NOT NULL,
+    first_seen REAL NOT NULL,
+    PRIMARY KEY (name, kind, title_hash),
+    UNIQUE (name, kind, url_hash)
+);
+CREATE INDEX IF NOT EXISTS ix_headlines_recent ON headlines (kind, published, name);
+CREATE TABLE IF NOT EXISTS fetches (
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    fetched REAL NOT NULL,
+    PRIMARY KEY (name, kind)
+);
+"""
+
+_SPACES = re.compile(r"\s+")
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def title_key(title: str) -> str:
+    """공백/대소문자만 다른 제목을 같은 기사로 본다."""
+    return _hash(_SPACES.sub(" ", title).strip().lower())
+
+
+class NewsStore:
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._pruned = 0.0
+
+    def ingest(
+        self,
+        name: str,
+        kind: str,
+        items: Iterable[Tuple[str, str, Optional[dt.datetime]]],
+        now: Optional[float] = None,
+    ) -> int:
+        """(제목, 링크, 시각) 목록을 추가하고 새로 들어간 건수를 반환. 시각이 없으면 처음 본 시각."""
+        now = time.time() if now is None else now
+        rows = [
+            (name, kind, title_key(title), _hash(link) if link else None, title, link or None, ts.timestamp() if ts else now, now)
+            for title, link, ts in items
+            if title
+        ]
+        with self._lock:
+            before = self._conn.total_changes
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany("INSERT OR IGNORE INTO headlines VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                added = self._conn.total_changes - before
+                self._conn.execute("INSERT OR REPLACE INTO fetches VALUES (?, ?, ?)", (name, kind, now))
+            if now - self._pruned >= PRUNE_EVERY_SEC:
+                self._pruned = now
+                self._conn.execute("DELETE FROM headlines WHERE published < ?", (now - RETENTION_DAYS * 86400,))
+        return added
+
+    def _select_names(self, sql: str, params: tuple, names: List[str]) -> list:
+        """sql 의 {names} 자리를 names IN 목록으로 채워 NAMES_PER_QUERY 개씩 나눠 실행한 결과 행."""
+        names = list(dict.fromkeys(names))
+        rows: list = []
+        with self._lock:
+            for i in range(0, len(names), NAMES_PER_QUERY):
+                chunk = names[i : i + NAMES_PER_QUERY]
+                rows += self._conn.execute(sql.format(names=",".join("?" * len(chunk))), (*params, *chunk)).fetchall()
+        return rows
+
+    def stale(self, names: List[str], kind: str, max_age: float, now: Optional[float] = None) -> List[str]:
+        """마지막 수집 후 max_age 초가 지났거나 한 번도 받지 않은 종목 (names 순서 유지)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            fresh = {
+                n for (n,) in self._conn.execute("SELECT name FROM fetches WHERE kind = ? AND fetched >= ?", (kind, now - max_age))
+            }
+        return [n for n in names if n not in fresh]
+
+    def _recent(self, names: List[str], kind: str, since: float) -> pd.DataFrame:
+        rows = self._select_names(
+            "SELECT name, published FROM headlines WHERE kind = ? AND published >= ? AND name IN ({names})", (kind, since), names
+        )
+        return pd.DataFrame(rows, columns=["name", "published"])
+
+    def counts(self, names: List[str], kind: str, since: float) -> pd.Series:
+        """since(epoch 초) 이후 종목별 헤드라인 수."""
+        rows = self._select_names(
+            "SELECT name, COUNT(*) FROM headlines WHERE kind = ? AND published >= ? AND name IN ({names}) GROUP BY name", (kind, since), names
+        )
+        return pd.Series(dict(rows), dtype="int64").reindex(names, fill_value=0)
+
+    def momentum(self, names: List[str], kind: str, half_life_hours: float, window_hours: float, now: Optional[float] = None) -> pd.Series:
+        """최근 window_hours 헤드라인의 시간 감쇠 합. 방금 나온 기사 1, half_life_hours 전 기사 0.5."""
+        now = time.time() if now is None else now
+        df = self._recent(names, kind, now - window_hours * 3600)
+        if df.empty:
+            return pd.Series(0.0, index=pd.Index(names))
+        age_hours = np.clip(now - df["published"].to_numpy(float), 0, None) / 3600
+        weight = pd.Series(np.power(0.5, age_hours / half_life_hours), index=df["name"])
+        return weight.groupby(level=0).sum().reindex(names, fill_value=0.0)
+
+    def revision(self, names: List[str]) -> pd.DataFrame:
+        """종목별 저장 헤드라인 현황(count, last_id). 새 기사가 들어오거나 정리되면 바뀐다."""
+        rows = self._select_names("SELECT name, COUNT(*), MAX(rowid) FROM headlines WHERE name IN ({names}) GROUP BY name", (), names)
+        df = pd.DataFrame([r[1:] for r in rows], index=[r[0] for r in rows], columns=["count", "last_id"])
+        return df.reindex(names, fill_value=0).astype("int64")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,34 @@
+import datetime as dt
+
+import news_store
+import theme_leader as tl
+from market_store import KST
+from news_store import NewsStore
+
+NOW = 1_700_000_000.0
+
+
+def store(tmp_path):
+    s = NewsStore(str(tmp_path / "news.sqlite3"))
+    s.ingest("a", "feature", [("a1", "http://a/1", None), ("a2", "http://a/2", None)], now=NOW - 60)
+    s.ingest("b", "feature", [("b1", "http://b/1", None)], now=NOW - 60)
+    s.ingest("c", "name", [("c1", "http://c/1", None)], now=NOW - 60)
+    return s
+
+
+def test_queries_return_only_requested_names(tmp_path, monkeypatch):
+    monkeypatch.setattr(news_store, "NAMES_PER_QUERY", 1)  # 나눠 조회해도 결과가 같아야 한다
+    s = store(tmp_path)
+    assert s.counts(["a", "x"], "feature", NOW - 3600).to_dict() == {"a": 2, "x": 0}
+    assert list(s._recent(["b"], "feature", NOW - 3600)["name"]) == ["b"]
+    assert s.momentum(["b", "c"], "feature", 12, 24, NOW).round(3).to_dict() == {"b": 0.999, "c": 0.0}
+    rev = s.revision(["c", "a", "x"])
+    assert rev["count"].to_dict() == {"c": 1, "a": 2, "x": 0}
+    s.close()
+
+
+def test_parse_news_time_keeps_kst():
+    now = dt.datetime(2026, 5, 1, 9, 0, tzinfo=KST)
+    assert tl._parse_news_time("3시간 전", now) == dt.datetime(2026, 5, 1, 6, 0, tzinfo=KST)
+    day = tl._parse_news_time("연합뉴스 2024.05.01.", now)
+    assert day.tzinfo is KST and day.timestamp() == dt.datetime(2024, 4, 30, 15, 0, tzinfo=dt.timezone.utc).timestamp()
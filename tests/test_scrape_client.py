@@ -0,0 +1,47 @@
+import time
+
+import pytest
+import requests
+
+from theme_leader import ScrapeClient
+
+
+class TimeoutSession:
+    def __init__(self):
+        self.timeouts = []
+
+    def get(self, url, timeout=None, **kwargs):
+        self.timeouts.append(timeout)
+        time.sleep(min(timeout, 0.05))
+        raise requests.Timeout(url)
+
+
+def client(session, max_retries=3, backoff=0.2):
+    c = ScrapeClient(rate=1e9, burst=10**9, max_retries=max_retries, backoff=backoff)
+    c.session = session
+    return c
+
+
+def test_deadline_stops_retries_and_caps_timeout():
+    session = TimeoutSession()
+    c = client(session)
+    start = time.monotonic()
+    with pytest.raises(requests.Timeout):
+        c.get("http://x", timeout=5, deadline=start + 0.3)
+    assert time.monotonic() - start < 0.6
+    assert all(t <= 0.3 for t in session.timeouts)
+    assert len(session.timeouts) < 4
+
+
+def test_expired_deadline_sends_no_request():
+    session = TimeoutSession()
+    with pytest.raises(requests.Timeout):
+        client(session).get("http://x", deadline=time.monotonic() - 1)
+    assert session.timeouts == []
+
+
+def test_without_deadline_retries_up_to_max():
+    session = TimeoutSession()
+    with pytest.raises(requests.Timeout):
+        client(session, max_retries=2, backoff=0.001).get("http://x", timeout=0.01)
+    assert len(session.timeouts) == 3
@@ -0,0 +1,93 @@
+import pandas as pd
+
+import theme_leader as tl
+from theme_leader import ReplayFeed, SnapshotPoller
+
+
+def frame(close):
+    codes = [f"{i:06d}" for i in range(1, len(close) + 1)]
+    return pd.DataFrame(
+        {
+            "Code": codes,
+            "close": close,
+            "chg_pct": [1.0] * len(close),
+            "value": [1_000_000] * len(close),
+            "marcap": [10**12] * len(close),
+        }
+    )
+
+
+class RecordingEngine:
+    def __init__(self):
+        self.applied = []
+
+    def apply_prices(self, changed):
+        self.applied.append(sorted(changed.index))
+        return []
+
+
+def test_poll_reports_only_changed_rows():
+    engine = RecordingEngine()
+    poller = SnapshotPoller(ReplayFeed([frame([100.0, 200.0, 300.0]), frame([100.0, 210.0, 300.0]), frame([100.0, 210.0, 300.0])]), engine=engine)
+
+    first = poller.poll_once()
+    assert sorted(first.index) == ["000001", "000002", "000003"]
+    assert engine.applied == []  # 첫 스냅샷은 기준값이라 엔진에 반영하지 않는다
+
+    second = poller.poll_once()
+    assert list(second.index) == ["000002"]
+    assert second.loc["000002", "close"] == 210.0
+    assert engine.applied == [["000002"]]
+
+    third = poller.poll_once()
+    assert third.empty
+    assert engine.applied == [["000002"]]
+    assert (poller.polls, poller.changed_rows) == (3, 4)
+
+
+def test_new_listing_counts_as_changed():
+    poller = SnapshotPoller(ReplayFeed([frame([100.0, 200.0]), frame([100.0, 200.0, 50.0])]))
+    poller.poll_once()
+    assert list(poller.poll_once().index) == ["000003"]
+
+
+def test_live_snapshot_only_from_started_poller():
+    poller = SnapshotPoller(ReplayFeed([frame([100.0])]), interval=3600)
+    poller.poll_once()
+    assert poller.live_snapshot() is None
+    assert tl._active_poller is None
+    try:
+        poller.start()
+        assert tl._active_poller is poller
+        assert poller.live_snapshot() is not None
+    finally:
+        poller.stop()
+    assert tl._active_poller is None
+
+
+def test_live_snapshot_expires_when_polls_stop_succeeding(monkeypatch):
+    poller = SnapshotPoller(ReplayFeed([frame([100.0])]), interval=3600)
+    try:
+        poller.start()
+        poller.poll_once()
+        assert poller.live_snapshot() is not None
+        later = tl.time.monotonic() + 3600 * tl.STREAM_STALE_POLLS + 1
+        monkeypatch.setattr(tl.time, "monotonic", lambda: later)
+        assert poller.running
+        assert poller.live_snapshot() is None
+    finally:
+        monkeypatch.undo()
+        poller.stop()
+
+
+def test_stop_then_start_leaves_one_thread():
+    poller = SnapshotPoller(ReplayFeed([frame([100.0])]), interval=3600)
+    poller.start()
+    first = poller._thread
+    poller.stop()
+    poller.start()
+    try:
+        assert not first.is_alive()
+        assert poller._thread is not first and poller.running
+    finally:
+        poller.stop()
@@ -0,0 +1,135 @@
+import threading
+import time
+
+import pytest
+
+import coalesce
+from coalesce import SWRCache
+from metrics import METRICS
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(coalesce.time, "monotonic", c)
+    return c
+
+
+def wait_idle(cache, timeout=5.0):
+    deadline = time.time() + timeout
+    while cache._refreshing and time.time() < deadline:
+        time.sleep(0.01)
+    assert not cache._refreshing
+
+
+def counter(name):
+    return METRICS.counters.get(name, 0)
+
+
+def make(ttl=10, stale=20):
+    calls = []
+
+    def fetch(key, scale=1):
+        calls.append(key)
+        return (key, len(calls) * scale)
+
+    return SWRCache(fetch, ttl, stale), calls
+
+
+def test_fresh_hit_and_default_args_share_key(clock):
+    cache, calls = make()
+    assert cache.get("a") == ("a", 1)
+    clock.now += 5
+    assert cache.get("a", 1) == ("a", 1)
+    assert cache.get("a", scale=1) == ("a", 1)
+    assert calls == ["a"]
+
+
+def test_stale_value_served_while_one_revalidation_runs(clock):
+    cache, calls = make()
+    cache.get("a")
+    clock.now += 15  # ttl 지남, stale 구간 안
+    before = counter("fetch_stale_served")
+    assert cache.get("a") == ("a", 1)
+    cache.get("a")  # 재검증 중 재요청은 두 번째 재검증을 만들지 않는다
+    wait_idle(cache)
+    assert counter("fetch_stale_served") - before >= 1
+    assert calls == ["a", "a"]
+    assert cache.get("a") == ("a", 2)
+
+
+def test_expired_beyond_stale_recomputes_synchronously(clock):
+    cache, calls = make()
+    cache.get("a")
+    clock.now += 31
+    assert cache.get("a") == ("a", 2)
+    assert calls == ["a", "a"]
+
+
+def test_failed_revalidation_keeps_previous_value(clock):
+    fail = {"on": False}
+
+    def fetch(key):
+        if fail["on"]:
+            raise RuntimeError("source down")
+        return key.upper()
+
+    cache = SWRCache(fetch, ttl=10, stale=20)
+    assert cache.get("a") == "A"
+    fail["on"] = True
+    clock.now += 15
+    before = counter("fetch_revalidate_errors")
+    assert cache.get("a") == "A"
+    wait_idle(cache)
+    assert counter("fetch_revalidate_errors") - before == 1
+    assert cache.get("a") == "A"
+
+
+def test_concurrent_misses_share_one_call():
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch(key):
+        calls.append(key)
+        started.set()
+        release.wait(5)
+        return key
+
+    cache = SWRCache(fetch, ttl=60)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("k"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    started.wait(5)
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert calls == ["k"]
+    assert results == ["k"] * 8
+
+
+def test_max_entries_evicts_least_recently_used(clock):
+    calls = []
+
+    def fetch(key):
+        calls.append(key)
+        return key
+
+    cache = SWRCache(fetch, ttl=60, max_entries=2)
+    cache.get("a")
+    cache.get("b")
+    cache.get("a")
+    cache.get("c")  # b 제거
+    cache.get("a")
+    cache.get("b")
+    assert calls == ["a", "b", "c", "b"]
@@ -0,0 +1,70 @@
+import random
+import re
+
+from theme_dict import load_theme_file
+from theme_leader import ThemeMatcher
+
+KEYWORDS = load_theme_file().theme_keywords
+
+
+def findall_counts(text, keywords=KEYWORDS):
+    # 단일 패스 매처 이전 방식: 테마별로 (테마명 + 키워드) re.findall 건수 합산
+    scored = {}
+    for theme, kws in keywords.items():
+        cnt = sum(len(re.findall(re.escape(kw), text, flags=re.IGNORECASE)) for kw in [theme] + kws)
+        if cnt > 0:
+            scored[theme] = cnt
+    return scored
+
+
+def random_texts(n, seed=7):
+    rng = random.Random(seed)
+    vocab = [kw for theme, kws in KEYWORDS.items() for kw in [theme] + kws]
+    vocab += [kw.lower() for kw in vocab] + ["삼성", "전자", "주가", "급등", "기", "선", "a", " ", "  "]
+    return ["".join(rng.choice(vocab) for _ in range(rng.randint(0, 12))) for _ in range(n)]
+
+
+TEXTS = [
+    "",
+    "HBM 메모리 반도체 수혜, 파운드리 투자 확대",
+    "전력기기 변압기 수주… 전력 인프라 K-방산 미사일",
+    "LNG선 수주 조선 선박 / 2차전지 양극재 음극재 전해질 배터리",
+    "양자컴퓨팅 퀀텀 양자 · AI 데이터센터 LLM 인공지능 ai said",
+    "SMR 원자력 원전 신약 임상 항체 바이오 협동로봇 자동화 로봇",
+] + random_texts(300)
+
+
+def test_count_matches_findall():
+    m = ThemeMatcher(KEYWORDS)
+    for text in TEXTS:
+        assert m.count(text) == findall_counts(text), text
+
+
+def test_count_many_matches_count():
+    m = ThemeMatcher(KEYWORDS)
+    table = m.count_many(TEXTS)
+    assert list(table.columns) == list(KEYWORDS)
+    for i, text in enumerate(TEXTS):
+        row = {t: int(n) for t, n in table.iloc[i].items() if n}
+        assert row == findall_counts(text), text
+
+
+def test_count_many_does_not_match_across_texts():
+    # 이어 붙인 경계에서 키워드가 새로 생기지 않아야 한다("반도" + "체")
+    m = ThemeMatcher(KEYWORDS)
+    table = m.count_many(["반도", "체"])
+    assert table.to_numpy().sum() == 0
+
+
+def test_self_overlapping_keywords_count_like_findall():
+    keywords = {"웃음": ["ㅋㅋ", "ㅋㅋㅋ"], "아아": ["aa", "aba"], "ㅋ": []}
+    m = ThemeMatcher(keywords)
+    assert m.count("ㅋㅋㅋ") == findall_counts("ㅋㅋㅋ", keywords)
+    assert m.count("ㅋㅋㅋ")["웃음"] == 2  # "ㅋㅋ" 1건 + "ㅋㅋㅋ" 1건
+    rng = random.Random(3)
+    texts = ["".join(rng.choice("ㅋab웃음 ") for _ in range(rng.randint(0, 15))) for _ in range(300)]
+    for text in texts:
+        assert m.count(text) == findall_counts(text, keywords), text
+    table = m.count_many(texts)
+    for i, text in enumerate(texts):
+        assert {t: int(n) for t, n in table.iloc[i].items() if n} == findall_counts(text, keywords), text
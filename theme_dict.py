@@ -0,0 +1,101 @@
+"""테마 사전(테마 → 종목, 테마 → 키워드) 파일 저장소.
+
+themes.json 을 읽어 내용 해시로 버전을 매기고, 파일이 바뀌면 다시 읽는다(핫 리로드).
+파생 구조(종목 → 테마 역색인, 키워드 매처, 테마별 종목 위치)는 호출부가 버전을 키로 한 번만 만든다.
+
+    {
+      "version": "2026.10",
+      "themes": {"반도체": {"stocks": ["삼성전자", ...], "keywords": ["HBM", ...]}}
+    }
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+DEFAULT_PATH = os.environ.get("THEME_LEADER_THEMES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "themes.json"))
+# 파일 변경 확인 최소 간격(초)
+RELOAD_CHECK_SEC = 5.0
+
+
+@dataclass(frozen=True)
+class ThemeDictionary:
+    version: str  # 파일 내용 해시(앞 12자리)
+    label: str  # 파일에 적힌 "version" 값(사람용)
+    theme_map: Dict[str, List[str]]
+    theme_keywords: Dict[str, List[str]]
+
+    @property
+    def themes(self) -> List[str]:
+        return list(self.theme_map)
+
+
+def parse_themes(raw: bytes) -> ThemeDictionary:
+    """JSON 바이트를 ThemeDictionary 로. 형식이 틀리면 ValueError."""
+    data = json.loads(raw)
+    themes = data.get("themes") if isinstance(data, dict) else None
+    if not isinstance(themes, dict):
+        raise ValueError("themes 항목이 없습니다")
+    theme_map: Dict[str, List[str]] = {}
+    keywords: Dict[str, List[str]] = {}
+    for name, spec in themes.items():
+        stocks = spec.get("stocks", []) if isinstance(spec, dict) else None
+        kws = spec.get("keywords", []) if isinstance(spec, dict) else None
+        if not isinstance(stocks, list) or not isinstance(kws, list):
+            raise ValueError(f"테마 형식 오류: {name}")
+        theme_map[name] = [str(s) for s in dict.fromkeys(stocks)]
+        keywords[name] = [str(k) for k in dict.fromkeys(kws)]
+    return ThemeDictionary(hashlib.sha1(raw).hexdigest()[:12], str(data.get("version", "")), theme_map, keywords)
+
+
+def load_theme_file(path: str = DEFAULT_PATH) -> ThemeDictionary:
+    with open(path, "rb") as f:
+        return parse_themes(f.read())
+
+
+class ThemeStore:
+    """사전 파일을 감시하며 최신 ThemeDictionary 를 돌려준다.
+
+    mtime 은 RELOAD_CHECK_SEC 에 한 번만 확인하고, 내용 해시가 같으면 기존 객체를 그대로 쓴다.
+    편집 중 깨진 파일은 무시하고 직전 버전을 유지한다(최초 로드 실패만 예외).
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self.reloads = 0
+        self.error = ""
+        self._current: Optional[ThemeDictionary] = None
+        self._mtime = 0.0
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def current(self) -> ThemeDictionary:
+        now = time.monotonic()
+        if self._current is not None and now - self._checked < RELOAD_CHECK_SEC:
+            return self._current
+        with self._lock:
+            if self._current is None or now - self._checked >= RELOAD_CHECK_SEC:
+                self._checked = now
+                self._reload_if_changed()
+        return self._current
+
+    def _reload_if_changed(self) -> None:
+        try:
+            mtime = os.path.getmtime(self.path)
+            if self._current is not None and mtime == self._mtime:
+                return
+            d = load_theme_file(self.path)
+        except (OSError, ValueError) as e:
+            if self._current is None:
+                raise
+            self.error = f"{type(e).__name__}: {e}"
+            return
+        self._mtime = mtime
+        self.error = ""
+        if self._current is None or d.version != self._current.version:
+            self._current = d
+            self.reloads += 1
@@ -0,0 +1,1525 @@
+"""테마 주도주 데이터/점수 계층.
+
+시세·종목목록·뉴스 수집, 테마 추정, 주도점수 산출을 담당한다. Streamlit UI(app.py)와
+헤드리스 작업(배치 분류 등)이 함께 import 한다.
+"""
+
+import os
+import re
+import random
+import sys
+import threading
+import time
+import datetime as dt
+from collections import OrderedDict
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+
+from coalesce import SingleFlight, refresh_pool, swr_cache
+from lazy_import import LazyModule
+from market_store import MarketStore, in_session, is_finished_day, now_kst
+from metrics import METRICS, METRICS_PORT, serve_prometheus, timed
+from news_store import NewsStore
+from theme_dict import ThemeDictionary, ThemeStore
+from trading_calendar import TradingCalendar
+
+# 무거운 원천 라이브러리는 해당 경로(pykrx 시세, FDR 목록/이력, 뉴스 파싱)가 처음 실행될 때 import
+fdr = LazyModule("FinanceDataReader")
+stock = LazyModule("pykrx.stock")
+bs4 = LazyModule("bs4")
+
+# 뉴스 신호 수집: 요청 1건당 타임아웃 / 랭킹 1회당 총 예산(초)
+NEWS_REQUEST_TIMEOUT = 5
+NEWS_BUDGET_SEC = 8.0
+NEWS_MAX_WORKERS = 8
+# 헤드라인 저장소: 검색별 재수집 간격, 감쇠 반감기, 감쇠 합 구간, 특징주 건수 구간
+NEWS_REFRESH_SEC = 60 * 8
+NEWS_HALF_LIFE_HOURS = 12.0
+NEWS_WINDOW_HOURS = 24 * 7
+NEWS_COUNT_HOURS = 24
+NEWS_QUERIES = (("name", "{}"), ("feature", "{} 특징주"))
+NEWS_SIGNAL_COLUMNS = ["popularity", "news_momentum", "news_hits"]
+HIST_MAX_WORKERS = 8
+# 종목 이력 메모리 캐시 최대 종목 수 / 장중 당일 봉 재조회 간격(초)
+HIST_CACHE_MAX_CODES = 1000
+HIST_LIVE_TTL_SEC = 60 * 10
+# 상세 차트 구간(달력 일수)과 화면당 최대 봉 개수
+CHART_RANGES = {"3개월": 92, "6개월": 183, "1년": 365, "3년": 365 * 3, "5년": 365 * 5, "10년": 365 * 10}
+CHART_MAX_BARS = 260
+CHART_MAX_BARS_MOBILE = 120
+CHART_RESOLUTIONS = [("일봉", None), ("주봉", "W-FRI"), ("월봉", "ME")]
+
+DEFAULT_MIN_MARCAP = 500_000_000_000
+# 주도점수 가중치: 거래대금, 등락률, 관심도, 뉴스모멘텀
+LEADER_WEIGHTS = (35, 30, 15, 20)
+MAX_INFERRED_THEMES = 4
+# 배치 분류(classify_themes.py) 결과 저장 종류
+THEME_INDEX_KIND = "themes"
+# 백그라운드 순위표 엔진 갱신 주기(초)
+ENGINE_INTERVAL_SEC = 60
+# 기본 시총 기준이 아닌 순위표(설정에서 바꾼 값)는 요청 때만 계산하고 이 시간(초)/개수만 보관
+ENGINE_ADHOC_TTL_SEC = 60 * 10
+ENGINE_ADHOC_MAX = 32
+# 종목 지표 캐시(IndicatorCache)에 보관하는 (종목, 기간) 수. 넘치면 가장 오래 안 쓴 것부터 제거(LRU)
+INDICATOR_CACHE_MAX = 256
+# 스트리밍 모드: 스냅샷 폴링 주기 / TOP10 화면 자동 갱신 주기(초)
+STREAM_INTERVAL_SEC = 30
+STREAM_UI_REFRESH_SEC = 10
+STREAM_STALE_POLLS = 3  # 이 주기 수만큼 폴링이 성공하지 못하면 스트리밍 스냅샷을 버리고 일반 스냅샷으로 폴백
+STREAM_JOIN_SEC = 5.0
+PRICE_COLUMNS = ["close", "chg_pct", "value", "marcap"]
+# 캐시 사전 준비 시각(KST, 평일). 08:55 목록/뉴스/이력, 09:01 당일 스냅샷, 15:45 종가 확정 후
+WARMUP_TIMES = os.environ.get("THEME_LEADER_WARMUP_AT", "08:55,09:01,15:45")
+WARMUP_NEWS_BUDGET_SEC = 120.0
+# 백그라운드 엔진/사전 준비는 첫 화면이 먼저 그려지도록 프로세스 시작 후 이만큼(초) 늦게 시작
+STARTUP_DEFER_SEC = 5.0
+
+# 네이버 스크래핑 공용 클라이언트 설정
+SCRAPE_USER_AGENT = "Mozilla/5.0"
+SCRAPE_RATE_PER_SEC = 5.0
+SCRAPE_BURST = 10
+SCRAPE_MAX_RETRIES = 3
+SCRAPE_BACKOFF_BASE = 0.5
+
+
+@st.cache_resource
+def market_store() -> MarketStore:
+    # 프로세스/레플리카 간 공유되는 거래일 단위 디스크 저장소
+    return MarketStore()
+
+
+@timed("get_krx_listing")
+@swr_cache(ttl=60 * 30, stale=60 * 60 * 24)
+@timed("get_krx_listing", miss=True)
+def get_krx_listing() -> pd.DataFrame:
+    store = market_store()
+    key = now_kst().strftime("%Y%m%d")
+    cached = store.read("listing", key)
+    if cached is not None:
+        return cached
+    last = store.latest_key("listing")
+    if last is None:
+        return _download_listing(key)
+    # 저장된 이전 목록으로 바로 응답하고(첫 화면), 오늘 목록은 백그라운드에서 받는다
+    refresh_pool().submit(_refresh_listing, key)
+    return store.read("listing", last)
+
+
+def _download_listing(key: str) -> pd.DataFrame:
+    df = fdr.StockListing("KRX")
+    keep = [c for c in ["Code", "Name", "Market", "Sector", "Industry", "Marcap"] if c in df.columns]
+    df = df[keep].copy()
+    df["Code"] = df["Code"].astype(str).str.zfill(6)
+    market_store().write("listing", key, df)
+    return df
+
+
+def _refresh_listing(key: str) -> None:
+    try:
+        _download_listing(key)
+    except Exception:
+        # 원천 실패 시 저장본을 계속 사용하고 캐시 만료 후 다시 시도
+        return
+    get_krx_listing.clear()
+    _build_listing_index.clear()
+
+
+class ListingIndex:
+    """종목 목록 위 해시 인덱스: 종목명/코드 → 행, 정렬된 종목명, 종목 → 테마 역색인."""
+
+    def __init__(self, df: pd.DataFrame, theme_map: Dict[str, List[str]]):
+        self.df = df.reset_index(drop=True)
+        self.by_name: Dict[str, int] = {}
+        self.by_code: Dict[str, int] = {}
+        for i, (name, code) in enumerate(zip(self.df["Name"], self.df["Code"])):
+            self.by_name.setdefault(name, i)
+            self.by_code.setdefault(code, i)
+        self.names: List[str] = sorted(self.by_name)
+        self.name_pos = {n: i for i, n in enumerate(self.names)}
+        self.themes_by_name: Dict[str, List[str]] = {}
+        for theme, arr in theme_map.items():
+            for n in arr:
+                self.themes_by_name.setdefault(n, []).append(theme)
+        # 테마별 상장 구성종목 행 위치 + 소속표(theme, Name, Code, Market)
+        self.theme_pos: Dict[str, List[int]] = {t: [self.by_name[n] for n in arr if n in self.by_name] for t, arr in theme_map.items()}
+        pairs = [(t, i) for t, pos in self.theme_pos.items() for i in pos]
+        cols = [c for c in ["Name", "Code", "Market"] if c in self.df.columns]
+        self.membership = self.df.iloc[[i for _, i in pairs]][cols].reset_index(drop=True)
+        self.membership.insert(0, "theme", [t for t, _ in pairs])
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.by_name
+
+    def row(self, name: str) -> Optional[pd.Series]:
+        i = self.by_name.get(name)
+        return None if i is None else self.df.iloc[i]
+
+    def row_by_code(self, code: str) -> Optional[pd.Series]:
+        i = self.by_code.get(code)
+        return None if i is None else self.df.iloc[i]
+
+    def rows(self, names: List[str]) -> pd.DataFrame:
+        """names 순서대로 상장 종목 행만(미상장 이름은 제외)."""
+        pos = [self.by_name[n] for n in names if n in self.by_name]
+        return self.df.iloc[pos]
+
+    def themes_of(self, name: str) -> List[str]:
+        return self.themes_by_name.get(name, [])
+
+    def theme_rows(self, theme: str) -> pd.DataFrame:
+        """테마 구성종목 중 상장 종목 행(사전 순서)."""
+        return self.df.iloc[self.theme_pos.get(theme, [])]
+
+
+@st.cache_resource
+def theme_store() -> ThemeStore:
+    return ThemeStore()
+
+
+def theme_dictionary() -> ThemeDictionary:
+    """현재 테마 사전(themes.json). 파일이 바뀌면 새 버전을 돌려준다."""
+    return theme_store().current()
+
+
+@st.cache_resource(ttl=60 * 30, max_entries=4)
+def _build_listing_index(version: str, _themes: ThemeDictionary) -> ListingIndex:
+    return ListingIndex(get_krx_listing(), _themes.theme_map)
+
+
+def listing_index() -> ListingIndex:
+    # get_krx_listing과 같은 주기 + 사전 버전이 바뀔 때만 재생성, 세션 간 복사 없이 공유
+    themes = theme_dictionary()
+    return _build_listing_index(themes.version, themes)
+
+
+def _fetch_trading_days(fromdate: str, todate: str) -> List[str]:
+    try:
+        days = stock.get_previous_business_days(fromdate=fromdate, todate=todate)
+    except Exception:
+        days = []
+    if not days:
+        # pykrx 실패 시 KOSPI 지수 일봉 날짜로 대체
+        days = fdr.DataReader("KS11", fromdate, todate).index
+    return [d.strftime("%Y%m%d") for d in days]
+
+
+@st.cache_resource
+def trading_calendar() -> TradingCalendar:
+    return TradingCalendar(market_store(), _fetch_trading_days)
+
+
+@timed("latest_bday_str")
+def latest_bday_str() -> str:
+    return trading_calendar().latest()
+
+
+def _ymd(s: str) -> dt.date:
+    return dt.datetime.strptime(s, "%Y%m%d").date()
+
+
+def _persist_snapshot(kind: str, date_str: str, df: pd.DataFrame) -> pd.DataFrame:
+    # 장 마감된 거래일 스냅샷만 저장(불변). 당일 장중 데이터는 메모리 캐시만 사용.
+    if not df.empty and is_finished_day(date_str):
+        market_store().write(kind, date_str, df)
+    return df
+
+
+def fetch_ohlcv_snapshot(date_str: str) -> pd.DataFrame:
+    """pykrx 전종목 시세 원천 조회(캐시 없음). 실패 시 예외."""
+    o = stock.get_market_ohlcv_by_ticker(date_str, market="ALL").reset_index()
+    o = o.rename(columns={"티커": "Code", "종가": "close", "등락률": "chg_pct", "거래대금": "value"})
+    o["Code"] = o["Code"].astype(str).str.zfill(6)
+    return o[["Code", "close", "chg_pct", "value"]]
+
+
+def fetch_marcap_snapshot(date_str: str) -> pd.DataFrame:
+    """pykrx 전종목 시총 원천 조회(캐시 없음). 실패 시 예외."""
+    m = stock.get_market_cap_by_ticker(date_str, market="ALL").reset_index()
+    m = m.rename(columns={"티커": "Code", "시가총액": "marcap"})
+    m["Code"] = m["Code"].astype(str).str.zfill(6)
+    return m[["Code", "marcap"]]
+
+
+@timed("get_latest_ohlcv")
+def get_latest_ohlcv(date_str: str) -> pd.DataFrame:
+    """저장소 → pykrx 순. 실패 시 빈 DF 반환(상위에서 FDR 폴백 처리)."""
+    cached = market_store().read("ohlcv", date_str)
+    if cached is not None:
+        return cached
+    try:
+        return _persist_snapshot("ohlcv", date_str, fetch_ohlcv_snapshot(date_str))
+    except Exception:
+        return pd.DataFrame(columns=["Code", "close", "chg_pct", "value"])
+
+
+@timed("get_latest_marcap")
+def get_latest_marcap(date_str: str) -> pd.DataFrame:
+    cached = market_store().read("marcap", date_str)
+    if cached is not None:
+        return cached
+    try:
+        return _persist_snapshot("marcap", date_str, fetch_marcap_snapshot(date_str))
+    except Exception:
+        return pd.DataFrame(columns=["Code", "marcap"])
+
+
+def compact_snapshot(px: pd.DataFrame, mc: pd.DataFrame) -> pd.DataFrame:
+    """시세(Code, close, chg_pct, value) + 시총(Code, marcap)을 Code 인덱스 한 프레임으로 합친다.
+
+    Code 는 sys.intern 으로 프로세스 안에서 한 벌만 두고, 가격/등락률은 float32,
+    거래대금/시총은 정수(int64)로 손실 없이 보관한다. 코드 집합 조회는 인덱스 해시로 한다.
+    """
+    px = px.drop_duplicates("Code")
+    codes = pd.Index([sys.intern(str(c)) for c in px["Code"]], name="Code")
+    marcap = mc.drop_duplicates("Code").set_index("Code")["marcap"].reindex(codes) if not mc.empty else pd.Series(0, index=codes)
+    return pd.DataFrame(
+        {
+            "close": pd.to_numeric(px["close"], errors="coerce").to_numpy(dtype="float32"),
+            "chg_pct": pd.to_numeric(px["chg_pct"], errors="coerce").to_numpy(dtype="float32"),
+            "value": pd.to_numeric(px["value"], errors="coerce").fillna(0).round().to_numpy(dtype="int64"),
+            "marcap": pd.to_numeric(marcap, errors="coerce").fillna(0).round().to_numpy(dtype="int64"),
+        },
+        index=codes,
+    )
+
+
+def _listing_marcap() -> pd.DataFrame:
+    # pykrx 시총 실패 시 listing의 Marcap 사용
+    listing = listing_index().df
+    if "Marcap" not in listing.columns:
+        return pd.DataFrame(columns=["Code", "marcap"])
+    return listing[["Code", "Marcap"]].rename(columns={"Marcap": "marcap"})
+
+
+@timed("price_snapshot")
+@swr_cache(ttl=60 * 10, stale=60 * 30, max_entries=8)
+@timed("price_snapshot", miss=True)
+def price_snapshot(date_str: str) -> pd.DataFrame:
+    """date_str 전종목 압축 스냅샷(compact_snapshot). pykrx 시세 실패 시 빈 프레임.
+
+    복사 없이 모든 세션이 공유하므로 호출부는 수정하지 않고 부분 조회만 한다.
+    """
+    px = get_latest_ohlcv(date_str)
+    if px.empty:
+        return compact_snapshot(px, pd.DataFrame(columns=["Code", "marcap"]))
+    mc = get_latest_marcap(date_str)
+    return compact_snapshot(px, mc if not mc.empty else _listing_marcap())
+
+
+@st.cache_resource
+def _fetch_pool() -> ThreadPoolExecutor:
+    # FDR 종목별 이력 조회용 공유 풀
+    return ThreadPoolExecutor(max_workers=HIST_MAX_WORKERS, thread_name_prefix="hist")
+
+
+@timed("fallback_price_snapshot")
+def fallback_price_snapshot(codes: List[str]) -> pd.DataFrame:
+    """FDR 기반 폴백: 종목별 일봉 마지막 2개로 등락률/거래대금 근사치 생성.
+
+    종목 이력은 fetch_hist(캐시/저장소 재사용)로 병렬 조회한 뒤 한 프레임으로 쌓아
+    한 번에 계산한다. 실패 종목은 결과의 attrs["failures"]에 {코드: 사유}로 남긴다.
+    """
+    cols = ["Code", "close", "chg_pct", "value"]
+    codes = list(dict.fromkeys(str(c).zfill(6) for c in codes))
+    failures: Dict[str, str] = {}
+    tails: Dict[str, pd.DataFrame] = {}
+
+    futs = {_fetch_pool().submit(fetch_hist, code): code for code in codes}
+    for fut, code in futs.items():
+        try:
+            h = fut.result()
+        except Exception as e:
+            failures[code] = f"조회 실패: {type(e).__name__}"
+            continue
+        if h is None or h.empty:
+            failures[code] = "데이터 없음"
+            continue
+        if "Volume" not in h.columns:
+            h = h.assign(Volume=0.0)
+        t = h[["Close", "Volume"]].dropna(subset=["Close"]).tail(2)
+        if len(t) < 2:
+            failures[code] = "거래일 2개 미만"
+            continue
+        tails[code] = t.reset_index(drop=True)
+
+    if not tails:
+        out = pd.DataFrame(columns=cols)
+    else:
+        stacked = pd.concat(tails, names=["Code", "i"])
+        prev_close = stacked["Close"].xs(0, level="i").astype(float)
+        last = stacked.xs(1, level="i").astype(float)
+        close = last["Close"]
+        chg = np.where(prev_close.to_numpy() > 0, (close.to_numpy() / prev_close.to_numpy() - 1.0) * 100, 0.0)
+        out = pd.DataFrame(
+            {
+                "Code": close.index.to_numpy(),
+                "close": close.to_numpy(),
+                "chg_pct": chg,
+                "value": last["Volume"].fillna(0).to_numpy() * close.to_numpy(),
+            },
+            columns=cols,
+        )
+    out.attrs["failures"] = failures
+    return out
+
+
+class TokenBucket:
+    """초당 rate 개 토큰을 채우는 버킷. acquire()는 토큰이 생길 때까지 대기하고 대기 시간을 반환."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return waited
+                need = (1.0 - self.tokens) / self.rate
+            time.sleep(need)
+            waited += need
+
+
+class ScrapeClient:
+    """keep-alive 세션 + 토큰버킷 레이트리밋 + 429/5xx 지수 백오프(지터)."""
+
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        rate: float = SCRAPE_RATE_PER_SEC,
+        burst: int = SCRAPE_BURST,
+        max_retries: int = SCRAPE_MAX_RETRIES,
+        backoff: float = SCRAPE_BACKOFF_BASE,
+    ):
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": SCRAPE_USER_AGENT})
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=NEWS_MAX_WORKERS * 2)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "retries": 0, "throttle_waits": 0, "throttle_wait_sec": 0.0, "errors": 0}
+
+    def _count(self, key: str, n=1):
+        with self._lock:
+            self.counters[key] += n
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self.counters)
+
+    def _last_attempt(self, attempt: int, delay: float, deadline: Optional[float]) -> bool:
+        if attempt >= self.max_retries:
+            return True
+        return deadline is not None and time.monotonic() + delay >= deadline
+
+    def get(self, url: str, timeout: float = NEWS_REQUEST_TIMEOUT, deadline: Optional[float] = None, **kwargs) -> requests.Response:
+        """deadline(time.monotonic 기준)이 있으면 요청 timeout 을 남은 시간으로 줄이고, 그 안에 끝낼 수 없는 재시도는 하지 않는다."""
+        attempt = 0
+        while True:
+            waited = self.bucket.acquire()
+            if waited > 0:
+                self._count("throttle_waits")
+                self._count("throttle_wait_sec", waited)
+            req_timeout = timeout
+            if deadline is not None:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    self._count("errors")
+                    raise requests.Timeout(f"예산 초과: {url}")
+                req_timeout = min(timeout, left)
+            self._count("requests")
+
+            delay = self.backoff * (2**attempt) * random.uniform(0.5, 1.5)
+            try:
+                r = self.session.get(url, timeout=req_timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if self._last_attempt(attempt, delay, deadline):
+                    self._count("errors")
+                    raise
+            else:
+                retry_after = r.headers.get("Retry-After", "")
+                if r.status_code in self.RETRY_STATUS and retry_after.isdigit():
+                    delay = min(float(retry_after), 10.0)
+                if r.status_code not in self.RETRY_STATUS or self._last_attempt(attempt, delay, deadline):
+                    if r.status_code >= 400:
+                        self._count("errors")
+                    r.raise_for_status()
+                    return r
+
+            self._count("retries")
+            attempt += 1
+            time.sleep(delay)
+
+
+@st.cache_resource
+def scrape_client() -> ScrapeClient:
+    return ScrapeClient()
+
+
+def _naver_news_url(query: str) -> str:
+    return f"https://search.naver.com/search.naver?where=news&query={query}"
+
+
+NewsItem = Tuple[str, str, Optional[dt.datetime]]
+
+_REL_TIME = re.compile(r"(\d+)\s*(분|시간|일|주)\s*전")
+_REL_UNIT = {"분": "minutes", "시간": "hours", "일": "days", "주": "weeks"}
+
+
+def _parse_news_time(text: str, now: dt.datetime) -> Optional[dt.datetime]:
+    """네이버 뉴스 표기('3시간 전', '2024.05.01.')를 now 와 같은 시간대(KST)의 datetime으로. 해석 불가 시 None."""
+    m = _REL_TIME.search(text)
+    if m:
+        return now - dt.timedelta(**{_REL_UNIT[m.group(2)]: int(m.group(1))})
+    m = re.search(r"(\d{4})\.(\d{1,2})\.(\d{1,2})\.", text)
+    if m:
+        return dt.datetime(int(m.group(1)), int(m.group(2)), int(m.group(3)), tzinfo=now.tzinfo)
+    return None
+
+
+def download_news_page(query: str, deadline: Optional[float] = None) -> List[NewsItem]:
+    """검색 결과 페이지를 받아 (제목, 링크, 시각) 전체 목록으로 파싱. deadline 은 ScrapeClient.get 으로 전달."""
+    r = scrape_client().get(_naver_news_url(query), deadline=deadline)
+    soup = bs4.BeautifulSoup(r.text, "lxml")
+    now = now_kst()  # 서버 시간대와 무관하게 epoch 로 바꿀 수 있도록 KST aware
+    out: List[NewsItem] = []
+    for a in soup.select("a.news_tit"):
+        title = a.get("title") or a.get_text(" ", strip=True)
+        if not title:
+            continue
+        area = a.find_parent("div", class_="news_area")
+        info = " ".join(s.get_text(" ", strip=True) for s in area.select("span.info")) if area else ""
+        out.append((title, a.get("href") or "", _parse_news_time(info, now)))
+    return out
+
+
+@timed("fetch_news_page")
+@swr_cache(ttl=60 * 8, stale=60 * 30, max_entries=5000)
+@timed("fetch_news_page", miss=True)
+def fetch_news_page(query: str) -> List[NewsItem]:
+    """download_news_page 결과를 쿼리별로 캐시.
+
+    fetch_news_titles / fetch_news_links는 이 결과를 잘라서 쓰므로 limit과 무관하게
+    쿼리당 TTL 동안 한 번만 요청한다.
+    """
+    return download_news_page(query)
+
+
+@timed("fetch_news_titles")
+def fetch_news_titles(query: str, limit: int = 20) -> List[str]:
+    return [title for title, _, _ in fetch_news_page(query)[:limit]]
+
+
+@timed("fetch_news_links")
+def fetch_news_links(query: str, limit: int = 10) -> List[tuple]:
+    return [(title, link) for title, link, _ in fetch_news_page(query) if link][:limit]
+
+
+@st.cache_resource
+def _news_pool() -> ThreadPoolExecutor:
+    # 세션/리런 간 공유되는 고정 크기 풀 (동시 접속 시에도 네이버 요청 수 상한)
+    return ThreadPoolExecutor(max_workers=NEWS_MAX_WORKERS, thread_name_prefix="news")
+
+
+@st.cache_resource
+def news_store() -> NewsStore:
+    return NewsStore(os.path.join(market_store().root, "news.sqlite3"))
+
+
+def _ingest_news(name: str, kind: str, query: str, deadline: float) -> int:
+    # 재수집 간격이 fetch_news_page TTL 과 같아 캐시를 거치지 않고 예산 마감 시각을 걸어 직접 받는다
+    return news_store().ingest(name, kind, download_news_page(query, deadline))
+
+
+@timed("collect_news_signals")
+def collect_news_signals(names: List[str], budget: float = NEWS_BUDGET_SEC) -> pd.DataFrame:
+    """종목별 관심도(popularity)와 특징주 뉴스 신호(news_momentum, news_hits)를 헤드라인 저장소에서 계산.
+
+    마지막 수집 후 NEWS_REFRESH_SEC 가 지난 검색만 총 예산(budget) 안에서 다시 받아 저장소에 추가(중복 제외)한다.
+    예산을 넘기거나 실패한 종목도 이미 저장된 헤드라인으로 값을 낸다.
+    popularity/news_momentum 은 종목명/특징주 검색 헤드라인의 시간 감쇠 합, news_hits 는 최근 NEWS_COUNT_HOURS 특징주 건수.
+    """
+    names = list(dict.fromkeys(names))
+    store = news_store()
+    deadline = time.monotonic() + budget
+    jobs = {}
+    if names:
+        pool = _news_pool()
+        for kind, fmt in NEWS_QUERIES:
+            for n in store.stale(names, kind, NEWS_REFRESH_SEC):
+                jobs[pool.submit(_ingest_news, n, kind, fmt.format(n), deadline)] = n
+
+    try:
+        for fut in as_completed(jobs, timeout=budget):
+            try:
+                METRICS.inc("news_ingested", fut.result())
+            except Exception:
+                METRICS.inc("news_ingest_errors")
+    except FuturesTimeout:
+        pass
+    finally:
+        for fut in jobs:
+            fut.cancel()
+
+    # 감쇠 기준 시각을 재수집 간격 단위로 내림 → 같은 구간 안에서는 저장 헤드라인이 같으면 값도 같다
+    now = time.time() // NEWS_REFRESH_SEC * NEWS_REFRESH_SEC
+    out = pd.DataFrame(
+        {
+            "popularity": store.momentum(names, "name", NEWS_HALF_LIFE_HOURS, NEWS_WINDOW_HOURS, now),
+            "news_momentum": store.momentum(names, "feature", NEWS_HALF_LIFE_HOURS, NEWS_WINDOW_HOURS, now),
+            "news_hits": store.counts(names, "feature", now - NEWS_COUNT_HOURS * 3600),
+        }
+    )
+    out.index = pd.Index(names, name="Name")
+    return out
+
+
+def minmax(s: pd.Series) -> pd.Series:
+    if len(s) == 0 or s.max() == s.min():
+        return pd.Series(np.zeros(len(s)), index=s.index)
+    return (s - s.min()) / (s.max() - s.min())
+
+
+class ThemeMatcher:
+    """테마 키워드 전체를 하나의 정규식으로 컴파일한 단일 패스 매처.
+
+    각 위치에서 가장 긴 키워드를 찾고, 같은 위치에서 시작하는 더 짧은 키워드(접두어)도
+    함께 집계한다. 키워드마다 직전 집계 끝 위치를 기억해 겹치는 매치는 세지 않으므로
+    (re.findall 처럼 "ㅋㅋ" 는 "ㅋㅋㅋ" 에서 1건) 키워드별 re.findall 합산과 같은 테마별 건수를 낸다.
+    """
+
+    def __init__(self, theme_keywords: Dict[str, List[str]]):
+        self.themes = list(theme_keywords)
+        weights: Dict[str, Dict[str, int]] = {}
+        for theme, kws in theme_keywords.items():
+            for kw in [theme] + kws:
+                w = weights.setdefault(kw.lower(), {})
+                w[theme] = w.get(theme, 0) + 1
+        # 매칭된 키워드 → 그 키워드와 접두어 키워드들의 (키워드, 테마 가중치) 목록
+        self.credit: Dict[str, List[Tuple[str, Dict[str, int]]]] = {
+            kw: [(p, w) for p, w in weights.items() if kw.startswith(p)] for kw in weights
+        }
+        alts = sorted(weights, key=len, reverse=True)
+        self.pattern = re.compile("(?=(" + "|".join(re.escape(k) for k in alts) + "))", re.IGNORECASE)
+
+    def _scan(self, text: str):
+        """(시작 위치, 테마, 건수)를 순서대로 생성. 같은 키워드의 겹치는 매치는 건너뛴다."""
+        ends: Dict[str, int] = {}
+        for m in self.pattern.finditer(text):
+            start = m.start()
+            for kw, w in self.credit[m.group(1).lower()]:
+                if start < ends.get(kw, 0):
+                    continue
+                ends[kw] = start + len(kw)
+                for theme, n in w.items():
+                    yield start, theme, n
+
+    def count(self, text: str) -> Dict[str, int]:
+        scored: Dict[str, int] = {}
+        for _, theme, n in self._scan(text):
+            scored[theme] = scored.get(theme, 0) + n
+        return scored
+
+    def count_many(self, texts: List[str]) -> pd.DataFrame:
+        """여러 텍스트(종목명/헤드라인 등)를 한 번에 스캔해 텍스트 × 테마 건수 표로 반환."""
+        out = np.zeros((len(texts), len(self.themes)), dtype=np.int32)
+        col = {t: j for j, t in enumerate(self.themes)}
+        # 키워드에 없는 구분자로 이어 붙여 한 번만 스캔
+        starts = np.cumsum([0] + [len(t) + 1 for t in texts[:-1]])
+        for start, theme, n in self._scan("\x00".join(texts)):
+            i = int(np.searchsorted(starts, start, side="right")) - 1
+            out[i, col[theme]] += n
+        return pd.DataFrame(out, columns=self.themes)
+
+
+@st.cache_resource(max_entries=4)
+def _build_theme_matcher(version: str, _themes: ThemeDictionary) -> ThemeMatcher:
+    return ThemeMatcher(_themes.theme_keywords)
+
+
+def theme_matcher() -> ThemeMatcher:
+    # 사전 버전이 바뀔 때만 다시 컴파일
+    themes = theme_dictionary()
+    return _build_theme_matcher(themes.version, themes)
+
+
+def _listing_text(df: pd.DataFrame) -> pd.Series:
+    # 업종/섹터 힌트 텍스트 (infer_themes 3단계와 같은 형식)
+    sector = df["Sector"].astype(str) if "Sector" in df.columns else pd.Series("", index=df.index)
+    industry = df["Industry"].astype(str) if "Industry" in df.columns else pd.Series("", index=df.index)
+    return sector + " " + industry
+
+
+def _rank_themes(scored: Dict[str, int], k: int = MAX_INFERRED_THEMES) -> List[Tuple[str, int]]:
+    return sorted(((t, n) for t, n in scored.items() if n > 0), key=lambda x: x[1], reverse=True)[:k]
+
+
+@st.cache_resource(ttl=60 * 60)
+def theme_index() -> Dict[str, List[str]]:
+    """배치 분류 결과(종목명 → 추정 테마 목록). 아직 배치가 돈 적 없으면 빈 dict."""
+    store = market_store()
+    key = store.latest_key(THEME_INDEX_KIND)
+    df = store.read(THEME_INDEX_KIND, key) if key else None
+    out: Dict[str, List[str]] = {}
+    if df is None:
+        return out
+    for name, theme in zip(df["Name"], df["theme"]):
+        themes = out.setdefault(name, [])
+        if theme:  # 빈 테마 행 = 분류했지만 해당 없음
+            themes.append(theme)
+    return out
+
+
+@timed("infer_themes")
+def infer_themes(name: str, index: ListingIndex) -> List[str]:
+    # 1) 직접 사전 매칭
+    direct = index.themes_of(name)
+    if direct:
+        return direct
+
+    # 배치 분류 결과가 있으면 조회로 끝냄(분류 뒤 사전에서 빠진 테마는 제외)
+    known = theme_index().get(name)
+    if known is not None:
+        current = set(theme_dictionary().themes)
+        return [t for t in known if t in current]
+
+    scored: Dict[str, int] = {}
+    matcher = theme_matcher()
+
+    # 2) 뉴스 키워드 매칭(테마명 + 동의어)
+    try:
+        blob = " ".join(fetch_news_titles(name, 30))
+        for theme, cnt in matcher.count(blob).items():
+            scored[theme] = scored.get(theme, 0) + cnt
+    except Exception:
+        pass
+
+    # 3) 업종/섹터 힌트 매칭
+    row = index.row(name)
+    if row is not None:
+        txt = " ".join(
+            [
+                str(row.get("Sector", "")),
+                str(row.get("Industry", "")),
+            ]
+        )
+        for theme, cnt in matcher.count(txt).items():
+            scored[theme] = scored.get(theme, 0) + cnt
+
+    return [t for t, _ in _rank_themes(scored)]
+
+
+def classify_universe(index: ListingIndex, use_news: bool = True, budget: Optional[float] = None) -> pd.DataFrame:
+    """상장 전 종목을 infer_themes와 같은 점수(뉴스 + 업종/섹터 키워드 건수)로 분류.
+
+    업종/섹터 텍스트와 뉴스 제목 묶음을 각각 theme_matcher().count_many로 한 번에 스캔한다.
+    반환: Code, Name, theme, score 롱 테이블. 해당 테마가 없는 종목은 theme="" 1행.
+    """
+    df = index.df
+    names = df["Name"].tolist()
+    matcher = theme_matcher()
+    scores = matcher.count_many(_listing_text(df).tolist())
+
+    if use_news:
+        blobs = dict.fromkeys(names, "")
+        futs = {_news_pool().submit(fetch_news_titles, n, 30): n for n in blobs}
+        try:
+            for fut in as_completed(futs, timeout=budget):
+                try:
+                    blobs[futs[fut]] = " ".join(fut.result())
+                except Exception:
+                    pass
+        except FuturesTimeout:
+            for fut in futs:
+                fut.cancel()
+        scores = scores + matcher.count_many([blobs[n] for n in names])
+
+    rows = []
+    for code, name, counts in zip(df["Code"], names, scores.to_dict("records")):
+        ranked = _rank_themes(counts)
+        if not ranked:
+            rows.append((code, name, "", 0))
+        rows.extend((code, name, t, n) for t, n in ranked)
+    return pd.DataFrame(rows, columns=["Code", "Name", "theme", "score"])
+
+
+def save_theme_index(df: pd.DataFrame) -> str:
+    store = market_store()
+    key = now_kst().strftime("%Y%m%d")
+    store.write(THEME_INDEX_KIND, key, df)
+    return store.path(THEME_INDEX_KIND, key)
+
+
+@timed("market_snapshot")
+def market_snapshot(codes: Optional[List[str]] = None) -> pd.DataFrame:
+    """최근 영업일 시세 + 시총 (Code 인덱스; close, chg_pct, value, marcap).
+
+    codes 가 있으면 해당 종목 행만(순서 유지, 없는 코드는 제외) 인덱스 조회로 돌려준다.
+    pykrx 전종목 조회가 실패하면 codes 에 대해서만 FDR 폴백 시세를 쓴다.
+    """
+    # 스트리밍 모드가 켜져 있으면(start() 한 폴러가 있으면) 최신 스냅샷 사용
+    poller = _active_poller
+    full = poller.live_snapshot() if poller is not None else None
+    if full is None:
+        full = price_snapshot(latest_bday_str())
+    failures: Dict[str, str] = {}
+    if full.empty:
+        px = fallback_price_snapshot(codes or [])
+        failures = px.attrs["failures"]
+        # pykrx 가 실패한 상황이므로 시총도 listing 값 사용
+        full = compact_snapshot(px, _listing_marcap())
+
+    if codes is None:
+        snap = full.copy(deep=False)
+    else:
+        pos = full.index.get_indexer(list(dict.fromkeys(codes)))
+        snap = full.iloc[pos[pos >= 0]]
+    snap.attrs["price_failures"] = failures
+    return snap
+
+
+def theme_membership(index: ListingIndex, include_classified: bool = False) -> pd.DataFrame:
+    """종목 ↔ 테마 소속표 (theme, Name, Code, Market). 읽기 전용(사전 버전마다 1회 생성된 공유 프레임).
+
+    include_classified=True 면 사전 밖 종목도 배치 분류 결과(theme_index)로 포함한다.
+    """
+    if not include_classified:
+        return index.membership
+    direct = set(index.themes_by_name)
+    extra = pd.DataFrame(
+        [(t, n) for n, ts in theme_index().items() if n not in direct for t in ts if t in index.theme_pos], columns=["theme", "Name"]
+    )
+    rows = index.rows(extra["Name"].unique().tolist())[["Name", "Code", "Market"]]
+    return pd.concat([index.membership, extra.merge(rows, on="Name", how="inner")], ignore_index=True)
+
+
+@timed("theme_inputs")
+def theme_inputs(theme: str, min_marcap=DEFAULT_MIN_MARCAP) -> pd.DataFrame:
+    """테마 구성 종목의 시세/시총/뉴스 신호를 모아 시총 필터까지 적용한 입력 프레임."""
+    index = listing_index()
+    if theme not in index.theme_pos:
+        return pd.DataFrame()
+
+    universe = index.theme_rows(theme)[["Name", "Code", "Market"]].reset_index(drop=True)
+    snap = market_snapshot(universe["Code"].tolist())
+
+    # 코드 집합 조회 결과를 위치 기준으로 붙임 (소수 행만 float64 로 되돌려 점수/표시에 사용)
+    px = snap.reindex(universe["Code"]).astype(float)
+    df = universe.assign(**{c: px[c].to_numpy() for c in snap.columns})
+    # 가격정보가 없는 행 제거
+    df = df.dropna(subset=["close", "chg_pct", "value"], how="any")
+    # 시총 결측이면 0 처리 후 필터
+    df["marcap"] = pd.to_numeric(df["marcap"], errors="coerce").fillna(0)
+    df = df[df["marcap"] >= min_marcap].copy()
+    df.attrs["price_failures"] = snap.attrs["price_failures"]
+    if df.empty:
+        return df
+
+    # proxies for "실시간 조회순위" and 뉴스 모멘텀
+    sig = collect_news_signals(df["Name"].tolist())
+    df["popularity"] = df["Name"].map(sig["popularity"]).fillna(0.0)
+    df["news_momentum"] = df["Name"].map(sig["news_momentum"]).fillna(0.0)
+    df["news_hits"] = df["Name"].map(sig["news_hits"]).fillna(0).astype(int)
+    return df
+
+
+def group_minmax(df: pd.DataFrame, col: str, by: Union[str, List[str]]) -> pd.Series:
+    """그룹별 min-max 정규화. 그룹 내 값이 모두 같으면 0 (minmax와 동일 규칙)."""
+    g = df.groupby(by, sort=False)[col]
+    lo = g.transform("min")
+    span = g.transform("max") - lo
+    return ((df[col] - lo) / span.where(span != 0)).fillna(0.0)
+
+
+def add_leader_scores(
+    df: pd.DataFrame,
+    by: Union[str, List[str], None] = None,
+    weights: Tuple[float, ...] = LEADER_WEIGHTS,
+) -> pd.DataFrame:
+    """s_value/s_chg/s_pop/s_news 와 leader_score 컬럼 추가. by 가 있으면 그룹(테마, 날짜×테마 등)별로 정규화."""
+    # leader model from your rules
+    # 거래대금 + 등락률 + 조회(관심) + 뉴스(재료)
+    def norm(col: str) -> pd.Series:
+        return minmax(df[col]) if by is None else group_minmax(df, col, by)
+
+    w_value, w_chg, w_pop, w_news = weights
+    df["s_value"] = norm("value") * w_value
+    df["s_chg"] = norm("chg_pct") * w_chg
+    df["s_pop"] = norm("popularity") * w_pop
+    df["s_news"] = norm("news_momentum") * w_news
+    df["leader_score"] = (df["s_value"] + df["s_chg"] + df["s_pop"] + df["s_news"]).round(2)
+    return df
+
+
+@timed("score_leaders")
+def score_leaders(df: pd.DataFrame, top_n: Optional[int] = None) -> pd.DataFrame:
+    if df.empty:
+        return df
+    df = add_leader_scores(df.copy())
+    top = df.sort_values("leader_score", ascending=False)
+    return top if top_n is None else top.head(top_n)
+
+
+@timed("score_all_themes")
+def score_all_themes(
+    snapshot: pd.DataFrame,
+    membership: pd.DataFrame,
+    signals: Optional[pd.DataFrame] = None,
+    min_marcap=DEFAULT_MIN_MARCAP,
+    weights: Tuple[float, ...] = LEADER_WEIGHTS,
+) -> pd.DataFrame:
+    """모든 테마의 주도점수를 한 번에 계산해 롱 테이블로 반환.
+
+    snapshot: market_snapshot() 형식(Code 인덱스), membership: theme_membership() 형식,
+    signals: collect_news_signals() 형식(Name 인덱스, 없으면 0).
+    반환: membership 컬럼 + 시세/시총/신호 + s_* + leader_score + rank(테마 내 순위).
+    """
+    df = membership.join(snapshot.astype(float), on="Code", how="inner")
+    df = df.dropna(subset=["close", "chg_pct", "value"], how="any")
+    df = df[df["marcap"] >= min_marcap]
+    if signals is not None and not signals.empty:
+        df = df.join(signals[[c for c in NEWS_SIGNAL_COLUMNS if c in signals.columns]], on="Name")
+    for col in NEWS_SIGNAL_COLUMNS:
+        df[col] = df[col].fillna(0) if col in df.columns else 0.0
+    if df.empty:
+        return df.reindex(columns=[*df.columns, "s_value", "s_chg", "s_pop", "s_news", "leader_score", "rank"])
+    df = add_leader_scores(df.reset_index(drop=True), by="theme", weights=weights)
+    df = df.sort_values(["theme", "leader_score"], ascending=[True, False], kind="stable")
+    df["rank"] = df.groupby("theme", sort=False).cumcount() + 1
+    return df.reset_index(drop=True)
+
+
+def theme_champions(scored: pd.DataFrame) -> pd.DataFrame:
+    """score_all_themes 결과에서 테마별 1위만, 주도점수 순."""
+    return scored[scored["rank"] == 1].sort_values("leader_score", ascending=False).reset_index(drop=True)
+
+
+def cross_theme_board(min_marcap=DEFAULT_MIN_MARCAP) -> pd.DataFrame:
+    """전 테마 1위 보드. 시세 스냅샷 1회 + 시총 통과 종목 뉴스 신호 1회 수집으로 계산."""
+    return _cross_theme_board(min_marcap, theme_dictionary().version)
+
+
+@timed("cross_theme_board")
+@st.cache_data(ttl=60 * 10)
+@timed("cross_theme_board", miss=True)
+def _cross_theme_board(min_marcap, version: str) -> pd.DataFrame:
+    # 사전 버전이 바뀌면 TTL 과 무관하게 새로 계산
+    membership = theme_membership(listing_index())
+    snap = market_snapshot(membership["Code"].unique().tolist())
+    names = membership.loc[membership["Code"].map(snap["marcap"]) >= min_marcap, "Name"].unique().tolist()
+    return theme_champions(score_all_themes(snap, membership, collect_news_signals(names), min_marcap))
+
+
+def build_top(theme: str, min_marcap=DEFAULT_MIN_MARCAP, top_n=10) -> pd.DataFrame:
+    return score_leaders(theme_inputs(theme, min_marcap), top_n)
+
+
+def _input_fingerprint(inp: pd.DataFrame) -> int:
+    """순위표 입력 해시. 시간 감쇠 신호 대신 원재료(시세 + 종목별 저장 헤드라인 건수/마지막 id)를 쓴다."""
+    if inp.empty:
+        return 0
+    raw = inp.drop(columns=["popularity", "news_momentum"], errors="ignore")
+    rev = news_store().revision(inp["Name"].tolist())
+    return hash((int(pd.util.hash_pandas_object(raw, index=False).sum()), int(pd.util.hash_pandas_object(rev).sum())))
+
+
+@dataclass
+class Leaderboard:
+    board: pd.DataFrame
+    fingerprint: int
+    computed_at: dt.datetime
+    checked_at: dt.datetime
+
+
+class LeaderboardEngine:
+    """모든 테마의 순위표를 백그라운드에서 유지.
+
+    주기마다 사전의 테마별 입력(시세 스냅샷 + 뉴스 신호, 기본 시총 기준)을 모아 해시를 비교하고,
+    바뀐 테마만 다시 점수화한다. UI는 lookup()으로 dict 조회만 한다.
+    다른 시총 기준 순위표는 요청 때 계산해 ENGINE_ADHOC_TTL_SEC 동안 최대 ENGINE_ADHOC_MAX 개(LRU)만 보관한다.
+    """
+
+    def __init__(self, interval: float = ENGINE_INTERVAL_SEC):
+        self.interval = interval
+        self.boards: "OrderedDict[Tuple[str, int], Leaderboard]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "LeaderboardEngine":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="leaderboard", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        time.sleep(STARTUP_DEFER_SEC)
+        while True:
+            # 사전에 새로 생긴 테마는 다음 주기부터 유지하고, 빠진 테마는 버린다
+            themes = theme_dictionary().themes
+            self.prune(themes)
+            for theme in themes:
+                try:
+                    self.refresh(theme, DEFAULT_MIN_MARCAP)
+                except Exception:
+                    pass
+            time.sleep(self.interval)
+
+    def prune(self, themes: List[str]) -> None:
+        """사전에 없는 테마의 순위표와 만료된 비기본 순위표 제거."""
+        keep = set(themes)
+        cutoff = dt.datetime.now() - dt.timedelta(seconds=ENGINE_ADHOC_TTL_SEC)
+        with self._lock:
+            for key in [k for k, lb in self.boards.items() if k[0] not in keep or (k[1] != DEFAULT_MIN_MARCAP and lb.checked_at < cutoff)]:
+                del self.boards[key]
+
+    def refresh(self, theme: str, min_marcap: int = DEFAULT_MIN_MARCAP) -> Leaderboard:
+        key = (theme, int(min_marcap))
+        inp = theme_inputs(theme, min_marcap)
+        fp = _input_fingerprint(inp)
+        now = dt.datetime.now()
+        with self._lock:
+            prev = self.boards.get(key)
+            if prev is not None and prev.fingerprint == fp:
+                prev.checked_at = now
+                METRICS.inc("engine_unchanged")
+                return prev
+        METRICS.inc("engine_rescored")
+        lb = Leaderboard(score_leaders(inp), fp, now, now)
+        with self._lock:
+            self.boards[key] = lb
+            self.boards.move_to_end(key)
+            adhoc = [k for k in self.boards if k[1] != DEFAULT_MIN_MARCAP]
+            for k in adhoc[: max(0, len(adhoc) - ENGINE_ADHOC_MAX)]:
+                del self.boards[k]
+        return lb
+
+    def lookup(self, theme: str, min_marcap: int = DEFAULT_MIN_MARCAP) -> Optional[Leaderboard]:
+        """보관 중인 순위표. 비기본 시총 기준은 ENGINE_ADHOC_TTL_SEC 가 지났으면 None(다시 계산)."""
+        key = (theme, int(min_marcap))
+        with self._lock:
+            lb = self.boards.get(key)
+            if lb is None or key[1] == DEFAULT_MIN_MARCAP:
+                return lb
+            if (dt.datetime.now() - lb.checked_at).total_seconds() >= ENGINE_ADHOC_TTL_SEC:
+                return None
+            self.boards.move_to_end(key)
+            return lb
+
+    def apply_prices(self, changed: pd.DataFrame) -> List[Tuple[str, int]]:
+        """바뀐 종목 시세(Code 인덱스)를 해당 종목이 있는 순위표에만 반영해 다시 점수화.
+
+        시총 기준 통과/탈락 같은 구성 변화는 다음 정기 refresh에서 반영된다.
+        """
+        cols = [c for c in PRICE_COLUMNS if c in changed.columns]
+        touched = []
+        for key, lb in list(self.boards.items()):
+            board = lb.board
+            if board.empty:
+                continue
+            hit = board["Code"].isin(changed.index)
+            if not hit.any():
+                continue
+            upd = board.copy()
+            upd[cols] = upd[cols].astype(float)
+            upd.loc[hit, cols] = changed.loc[upd.loc[hit, "Code"], cols].to_numpy()
+            now = dt.datetime.now()
+            with self._lock:
+                self.boards[key] = Leaderboard(score_leaders(upd), lb.fingerprint, now, now)
+            touched.append(key)
+        return touched
+
+
+@st.cache_resource
+def leaderboard_engine() -> LeaderboardEngine:
+    return LeaderboardEngine().start()
+
+
+def krx_live_feed() -> pd.DataFrame:
+    """최근 영업일 전종목 시세 + 시총을 캐시 없이 조회 (스트리밍 기본 피드)."""
+    ds = latest_bday_str()
+    return compact_snapshot(fetch_ohlcv_snapshot(ds), fetch_marcap_snapshot(ds))
+
+
+class ReplayFeed:
+    """미리 준비한 스냅샷을 순서대로 돌려주는 로컬 피드(테스트/시연용). 끝나면 마지막 것을 반복."""
+
+    def __init__(self, frames: List[pd.DataFrame]):
+        self.frames = frames
+        self.i = 0
+
+    def __call__(self) -> pd.DataFrame:
+        f = self.frames[min(self.i, len(self.frames) - 1)]
+        self.i += 1
+        return f
+
+
+class SnapshotPoller:
+    """장중 스냅샷을 주기적으로 받아 직전 값과 비교하고, 바뀐 종목만 순위표 엔진에 반영."""
+
+    def __init__(
+        self,
+        feed: Callable[[], pd.DataFrame] = krx_live_feed,
+        interval: float = STREAM_INTERVAL_SEC,
+        engine: Optional[LeaderboardEngine] = None,
+    ):
+        self.feed = feed
+        self.interval = interval
+        self.engine = engine
+        self.latest: Optional[pd.DataFrame] = None
+        self.updated_at: Optional[dt.datetime] = None
+        self.polls = 0
+        self.changed_rows = 0
+        self._polled_at = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def live_snapshot(self) -> Optional[pd.DataFrame]:
+        """실행 중이고 최근 STREAM_STALE_POLLS 주기 안에 폴링이 성공했을 때만 스냅샷을 반환."""
+        if not self.running or self.latest is None:
+            return None
+        if time.monotonic() - self._polled_at > self.interval * STREAM_STALE_POLLS:
+            return None
+        return self.latest
+
+    def poll_once(self) -> pd.DataFrame:
+        """피드 1회 조회 → 바뀐 행(Code 인덱스) 반환 및 엔진 반영."""
+        snap = self.feed()
+        if "Code" in snap.columns:
+            snap = compact_snapshot(snap, snap if "marcap" in snap.columns else snap.iloc[:0])
+        prev = self.latest
+        if prev is None:
+            changed = snap
+        else:
+            cols = [c for c in PRICE_COLUMNS if c in snap.columns]
+            cur, old = snap[cols].align(prev[cols], join="left", axis=0)
+            same = (cur == old) | (cur.isna() & old.isna())
+            changed = snap[~same.all(axis=1)]
+        self.latest = snap
+        self.updated_at = dt.datetime.now()
+        self._polled_at = time.monotonic()
+        self.polls += 1
+        self.changed_rows += len(changed)
+        METRICS.inc("stream_polls")
+        METRICS.inc("stream_changed_rows", len(changed))
+        if self.engine is not None and prev is not None and not changed.empty:
+            self.engine.apply_prices(changed)
+        return changed
+
+    def _run(self, stop: threading.Event):
+        # 스레드마다 자기 stop 이벤트를 보므로 stop() 직후 start() 해도 이전 스레드가 되살아나지 않는다
+        while not stop.is_set():
+            try:
+                self.poll_once()
+            except Exception:
+                METRICS.inc("stream_poll_errors")
+            stop.wait(self.interval)
+
+    def start(self, engine: Optional[LeaderboardEngine] = None) -> "SnapshotPoller":
+        """폴링 시작. 이때부터 market_snapshot() 이 이 폴러의 스냅샷을 쓴다. engine 이 있으면 바뀐 행을 반영."""
+        global _active_poller
+        if engine is not None:
+            self.engine = engine
+        if not self.running:
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(self._stop,), name="snapshot-poller", daemon=True)
+            self._thread.start()
+        _active_poller = self
+        return self
+
+    def stop(self) -> None:
+        global _active_poller
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(STREAM_JOIN_SEC)
+        self._thread = None
+        self.latest = None
+        if _active_poller is self:
+            _active_poller = None
+
+
+# 시작된 폴러(없으면 market_snapshot 은 캐시된 스냅샷 사용)
+_active_poller: Optional[SnapshotPoller] = None
+
+
+@st.cache_resource
+def snapshot_poller() -> SnapshotPoller:
+    # 서버 공용 폴러. 설정 탭에서 켜고 끈다(엔진은 start 때 연결).
+    return SnapshotPoller()
+
+
+def leaderboard(theme: str, min_marcap=DEFAULT_MIN_MARCAP, top_n=10) -> pd.DataFrame:
+    """엔진에 계산된 순위표 조회. 아직 없으면(첫 요청/새 설정) 즉시 계산해 등록."""
+    eng = leaderboard_engine()
+    lb = eng.lookup(theme, min_marcap) or eng.refresh(theme, min_marcap)
+    top = lb.board.head(top_n)
+    top.attrs["computed_at"] = lb.computed_at
+    return top
+
+
+@dataclass
+class _History:
+    bars: pd.DataFrame
+    start: dt.date  # 이 날짜 이후 구간은 모두 받아 둠(상장 전이면 봉이 없을 수 있음)
+    through: str  # 마지막으로 맞춰 본 최근 영업일(YYYYMMDD)
+    checked: float  # 마지막 동기화 시각(monotonic)
+
+
+class HistoryCache:
+    """종목별 일봉 이력. 이미 받은 봉은 메모리/저장소에 두고 빠진 앞·뒤 구간만 FDR 에서 받는다.
+
+    days 가 달라도 같은 이력을 잘라서 돌려주며, 장중에는 당일 봉만 HIST_LIVE_TTL_SEC 간격으로 다시 받는다.
+    뒤 구간은 마지막 보유 봉부터 받아, 확정된 봉 종가가 달라졌으면(수정주가 반영) 전체를 다시 받는다.
+    """
+
+    def __init__(self, store: MarketStore, max_codes: int = HIST_CACHE_MAX_CODES):
+        self.store = store
+        self.max_codes = max_codes
+        self.entries: "OrderedDict[str, _History]" = OrderedDict()
+        self.flight = SingleFlight()
+        self._lock = threading.Lock()
+
+    def _covers(self, e: Optional[_History], start: dt.date, end: str) -> bool:
+        if e is None or e.start > start or e.through != end:
+            return False
+        return is_finished_day(end) or time.monotonic() - e.checked < HIST_LIVE_TTL_SEC
+
+    def _from_store(self, code: str, end: str) -> Optional[_History]:
+        h = self.store.read("hist", code)
+        if h is None:
+            return None
+        meta = self.store.read_meta("hist", code)
+        start = dt.date.fromisoformat(meta["start"]) if "start" in meta else (h.index[0].date() if len(h) else dt.date.today())
+        # 장외 시간에 마지막 종가 확정 이후 저장된 파일이면 최근 영업일까지 맞춰진 것
+        through = end if not in_session() and self.store.is_fresh("hist", code) else ""
+        return _History(h, start, through, 0.0)
+
+    def _sync(self, code: str, start: dt.date, end: str) -> _History:
+        with self._lock:
+            e = self.entries.get(code)
+        e = e or self._from_store(code, end)
+        end_d = _ymd(end)
+        before = (len(e.bars), e.start) if e is not None else None
+        if e is None or e.bars.empty:
+            bars, covered = fdr.DataReader(code, start, end_d), start
+        else:
+            bars, covered = e.bars, e.start
+            try:
+                if start < covered:
+                    head = fdr.DataReader(code, start, covered - dt.timedelta(days=1))
+                    bars = pd.concat([head, bars]) if head is not None and not head.empty else bars
+                    covered = start
+                if e.through != end or not is_finished_day(end):
+                    last = bars.index[-1]
+                    tail = fdr.DataReader(code, last.date(), end_d)
+                    if tail is not None and not tail.empty:
+                        if is_finished_day(last.strftime("%Y%m%d")) and last in tail.index and tail.at[last, "Close"] != bars.at[last, "Close"]:
+                            bars = fdr.DataReader(code, covered, end_d)
+                        else:
+                            bars = pd.concat([bars[bars.index < tail.index[0]], tail])
+                METRICS.inc("hist_delta_sync")
+            except Exception:
+                # 증분 조회 실패 시 보유 이력으로 응답하고 다음 요청에서 다시 시도
+                METRICS.inc("hist_delta_errors")
+                return e
+        if bars is None:
+            bars = pd.DataFrame()
+        e = _History(bars, covered, end, time.monotonic())
+        if not bars.empty and (len(bars), covered) != before:
+            # 확정된 일봉만 저장(장중 당일 봉 제외). 장중 당일 봉만 바뀐 경우는 다시 쓰지 않는다.
+            finished = bars[[is_finished_day(d.strftime("%Y%m%d")) for d in bars.index]]
+            self.store.write("hist", code, finished, meta={"start": covered.isoformat()})
+        with self._lock:
+            self.entries[code] = e
+            self.entries.move_to_end(code)
+            while len(self.entries) > self.max_codes:
+                self.entries.popitem(last=False)
+        return e
+
+    def window(self, code: str, days: int) -> pd.DataFrame:
+        cal = trading_calendar()
+        end = cal.latest()
+        start = _ymd(cal.first_on_or_after((dt.date.today() - dt.timedelta(days=days)).strftime("%Y%m%d")))
+        with self._lock:
+            e = self.entries.get(code)
+        if not self._covers(e, start, end):
+            e = self.flight.do(code, lambda: self._sync(code, start, end))
+        if e.bars.empty:
+            return e.bars
+        return e.bars[e.bars.index >= pd.Timestamp(start)]
+
+
+@st.cache_resource
+def history_cache() -> HistoryCache:
+    return HistoryCache(market_store())
+
+
+@timed("fetch_hist")
+def fetch_hist(code: str, days: int = 240) -> pd.DataFrame:
+    """최근 days 일(달력 기준) 일봉. 종목별 증분 이력 캐시에서 잘라서 돌려준다."""
+    return history_cache().window(code, days)
+
+
+INDICATOR_COLUMNS = ["close", "ma20", "ma60", "vol_ratio", "ret_1m", "ret_3m", "high_52w", "low_52w"]
+
+
+def compute_indicators(h: pd.DataFrame) -> pd.DataFrame:
+    """일봉 전체 구간의 지표 프레임(MA20/MA60, 거래량 배수, 1M/3M 수익률, 52주 고저)."""
+    h = h.dropna(subset=["Close"])
+    close = h["Close"].astype(float)
+    vol = h["Volume"].fillna(0).astype(float)
+    vol20 = vol.rolling(20).mean()
+    return pd.DataFrame(
+        {
+            "close": close,
+            "ma20": close.rolling(20).mean(),
+            "ma60": close.rolling(60).mean(),
+            "vol_ratio": vol / vol20.where(vol20 != 0),
+            "ret_1m": (close / close.shift(20) - 1) * 100,
+            "ret_3m": (close / close.shift(62) - 1) * 100,
+            "high_52w": close.rolling(252, min_periods=1).max(),
+            "low_52w": close.rolling(252, min_periods=1).min(),
+        },
+        index=h.index,
+    )[INDICATOR_COLUMNS]
+
+
+def _last_indicator_row(h: pd.DataFrame) -> pd.DataFrame:
+    # 마지막 봉 1개의 지표만 꼬리 구간(최대 252봉)으로 계산
+    return compute_indicators(h.tail(252)).tail(1)
+
+
+class IndicatorCache:
+    """종목별 (이력, 지표 프레임) 보관.
+
+    새 일봉 1개가 붙었거나(구간 시작이 함께 밀려도 무방) 당일 봉만 바뀐 경우 마지막 행만
+    다시 계산하고, 그 밖에는 전체를 다시 계산한다. 최근에 쓴 max_entries 개만 보관(LRU).
+    """
+
+    def __init__(self, max_entries: int = INDICATOR_CACHE_MAX):
+        self.max_entries = max_entries
+        self._frames: "OrderedDict[str, Tuple[pd.DataFrame, pd.DataFrame]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _incremental(prev_h: pd.DataFrame, prev_ind: pd.DataFrame, h: pd.DataFrame) -> Optional[pd.DataFrame]:
+        if len(h) < 2 or h.index[0] not in prev_ind.index:
+            return None
+        if h.index[-1] == prev_h.index[-1]:
+            # 장중 당일 봉 갱신
+            if not h.iloc[-2].equals(prev_h.iloc[-2]):
+                return None
+            kept = prev_ind.loc[h.index[0] :].iloc[:-1]
+        elif h.index[-2] == prev_h.index[-1] and h.iloc[-2].equals(prev_h.iloc[-1]):
+            # 새 일봉 1개 추가
+            kept = prev_ind.loc[h.index[0] :]
+        else:
+            return None
+        if not kept.index.equals(h.index[:-1]):
+            return None
+        return pd.concat([kept, _last_indicator_row(h)])
+
+    def get(self, code: str, h: pd.DataFrame) -> pd.DataFrame:
+        h = h.dropna(subset=["Close"])
+        with self._lock:
+            prev = self._frames.get(code)
+            if prev is not None:
+                self._frames.move_to_end(code)
+        ind = None
+        if prev is not None and not h.empty:
+            prev_h, prev_ind = prev
+            if h.index.equals(prev_h.index) and h.iloc[-1].equals(prev_h.iloc[-1]):
+                METRICS.inc("indicator_reused")
+                return prev_ind
+            ind = self._incremental(prev_h, prev_ind, h)
+        if ind is None:
+            METRICS.inc("indicator_full")
+            ind = compute_indicators(h)
+        else:
+            METRICS.inc("indicator_incremental")
+        with self._lock:
+            self._frames[code] = (h, ind)
+            self._frames.move_to_end(code)
+            while len(self._frames) > self.max_entries:
+                self._frames.popitem(last=False)
+        return ind
+
+
+@st.cache_resource
+def indicator_cache() -> IndicatorCache:
+    return IndicatorCache()
+
+
+@timed("stock_frames")
+def stock_frames(code: str, days: int = 240) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """상세 화면용 (일봉, 지표) 한 쌍. 이력 조회 1회로 차트와 종목분석이 함께 쓴다."""
+    h = fetch_hist(code, days)
+    if h is None or h.empty:
+        return pd.DataFrame(), pd.DataFrame(columns=INDICATOR_COLUMNS)
+    return h, indicator_cache().get(f"{code}:{days}", h)
+
+
+def resample_ohlc(h: pd.DataFrame, rule: str) -> pd.DataFrame:
+    """일봉을 rule(W-FRI/ME 등) 단위 OHLCV 로 묶는다. 인덱스는 각 구간의 마지막 실제 거래일."""
+    h = h.dropna(subset=["Close"])
+    grouped = h.resample(rule)
+    out = pd.DataFrame(
+        {
+            "Open": grouped["Open"].first(),
+            "High": grouped["High"].max(),
+            "Low": grouped["Low"].min(),
+            "Close": grouped["Close"].last(),
+            "Volume": grouped["Volume"].sum(),
+        }
+    )
+    last_day = h.index.to_series().resample(rule).last()
+    out.index = pd.DatetimeIndex(last_day.values, name=h.index.name)
+    return out[out.index.notna()]
+
+
+@timed("chart_bars")
+@swr_cache(ttl=HIST_LIVE_TTL_SEC, stale=60 * 30, max_entries=256)
+@timed("chart_bars", miss=True)
+def chart_bars(code: str, days: int, max_bars: int = CHART_MAX_BARS) -> Tuple[pd.DataFrame, str]:
+    """차트용 (봉, 해상도). 일봉 → 주봉 → 월봉 중 봉 개수가 max_bars 이하인 첫 해상도로 묶는다.
+
+    구간이 길어도 화면으로 보내는 봉은 max_bars 개를 넘지 않는다(월봉으로도 넘치면 최근 max_bars 개).
+    """
+    h = fetch_hist(code, days)
+    if h is None or h.empty:
+        return pd.DataFrame(), CHART_RESOLUTIONS[0][0]
+    h = h[["Open", "High", "Low", "Close", "Volume"]]
+    for label, rule in CHART_RESOLUTIONS:
+        bars = h if rule is None else resample_ohlc(h, rule)
+        if len(bars) <= max_bars:
+            return bars, label
+    return bars.tail(max_bars), label
+
+
+def warm_up(news_budget: float = WARMUP_NEWS_BUDGET_SEC) -> Dict[str, float]:
+    """목록 → 거래일 → 전종목 스냅샷 → 전 테마 종목 뉴스 → 종목 이력/지표 순으로 캐시를 채운다.
+
+    각 단계 소요 시간(초)을 반환. 대화형 요청과 같은 캐시를 쓰므로 이미 채워진 단계는 바로 끝난다.
+    """
+    took: Dict[str, float] = {}
+
+    def step(name: str, fn: Callable[[], object]):
+        t0 = time.perf_counter()
+        with METRICS.span(f"warm_up.{name}"):
+            out = fn()
+        took[name] = round(time.perf_counter() - t0, 3)
+        return out
+
+    index = step("listing", listing_index)
+    ds = step("calendar", latest_bday_str)
+    step("snapshot", lambda: price_snapshot(ds))
+    step("matcher", theme_matcher)
+    members = index.membership.drop_duplicates("Code")
+    step("news", lambda: collect_news_signals(members["Name"].tolist(), budget=news_budget))
+    step("history", lambda: list(_fetch_pool().map(stock_frames, members["Code"].tolist())))
+    return took
+
+
+def _parse_times(spec: str) -> List[dt.time]:
+    out = []
+    for part in spec.split(","):
+        part = part.strip()
+        if part:
+            h, m = part.split(":")
+            out.append(dt.time(int(h), int(m)))
+    return sorted(out)
+
+
+class CacheWarmer:
+    """프로세스 시작 시 1회 + 평일 지정 시각(KST)마다 warm_up 을 백그라운드로 실행."""
+
+    def __init__(self, times: str = WARMUP_TIMES):
+        self.times = _parse_times(times)
+        self.last_at: Optional[dt.datetime] = None
+        self.last_took: Dict[str, float] = {}
+        self.last_error = ""
+        self.runs = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def next_run(self, now: Optional[dt.datetime] = None) -> Optional[dt.datetime]:
+        now = now or now_kst()
+        for add in range(8):
+            d = now.date() + dt.timedelta(days=add)
+            if d.weekday() >= 5:
+                continue
+            for t in self.times:
+                at = dt.datetime.combine(d, t, tzinfo=now.tzinfo)
+                if at > now:
+                    return at
+        return None
+
+    def run_once(self) -> None:
+        try:
+            self.last_took = warm_up()
+            self.last_error = ""
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+        self.last_at = now_kst()
+        self.runs += 1
+
+    def _run(self):
+        time.sleep(STARTUP_DEFER_SEC)
+        self.run_once()
+        while True:
+            at = self.next_run()
+            if at is None:
+                return
+            time.sleep(max(0.0, (at - now_kst()).total_seconds()))
+            self.run_once()
+
+    def start(self) -> "CacheWarmer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="cache-warmer", daemon=True)
+            self._thread.start()
+        return self
+
+
+@st.cache_resource
+def cache_warmer() -> CacheWarmer:
+    return CacheWarmer().start()
+
+
+@st.cache_resource
+def startup_report() -> Dict[str, float]:
+    """프로세스당 1회 채우는 시작 계측(app.py 첫 실행이 기록): import_ms, first_paint_ms."""
+    return {}
+
+
+def runtime_counters() -> Dict[str, float]:
+    """계측 카운터 외에 스크래핑 클라이언트 통계를 합친 값 (진단/Prometheus 노출용)."""
+    return {f"scrape_{k}": v for k, v in scrape_client().stats().items()}
+
+
+@st.cache_resource
+def metrics_server():
+    """THEME_LEADER_METRICS_PORT 가 설정되면 /metrics 를 1회만 띄운다."""
+    if not METRICS_PORT:
+        return None
+    return serve_prometheus(METRICS_PORT, extra=runtime_counters)
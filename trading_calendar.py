@@ -0,0 +1,138 @@
+"""KRX 거래일 캘린더.
+
+거래일 목록을 한 번 받아 저장소에 보관하고, "최근 영업일"/"이전 영업일"을 메모리에서 O(1)로 답한다.
+장 개장/마감 경계를 넘으면 꼬리 구간만 다시 받아 스스로 갱신한다.
+"""
+
+import bisect
+import datetime as dt
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from market_store import MARKET_CLOSE, MARKET_OPEN, MarketStore, now_kst
+
+CALENDAR_HISTORY_DAYS = 365 * 3
+# 개장 직후 원천에 당일이 아직 없으면 이 간격(초)으로 재확인
+CALENDAR_RETRY_SEC = 600
+
+FetchDays = Callable[[str, str], List[str]]
+
+
+def boundary_epoch(now: dt.datetime) -> str:
+    """마지막으로 지난 개장/마감 경계. 값이 바뀌면 캘린더를 다시 확인해야 한다."""
+    t = now.time()
+    d = now.strftime("%Y%m%d")
+    if t >= MARKET_CLOSE:
+        return f"{d}-close"
+    if t >= MARKET_OPEN:
+        return f"{d}-open"
+    return f"{d}-pre"
+
+
+class TradingCalendar:
+    def __init__(self, store: MarketStore, fetch_days: FetchDays):
+        self.store = store
+        self.fetch_days = fetch_days
+        self.days: List[str] = []
+        self.pos: Dict[str, int] = {}
+        self._epoch = ""
+        self._checked_at = 0.0
+        self._latest = ""
+        self._lock = threading.Lock()
+
+    def _set_days(self, days: List[str]) -> None:
+        self.days = sorted(set(days))
+        self.pos = {d: i for i, d in enumerate(self.days)}
+
+    def _refresh(self, now: dt.datetime) -> None:
+        today = now.strftime("%Y%m%d")
+        if not self.days:
+            saved = self.store.read("calendar", "krx")
+            if saved is not None:
+                self._set_days(saved["date"].tolist())
+
+        if self.days:
+            fromdate = self.days[-1]
+        else:
+            fromdate = (now.date() - dt.timedelta(days=CALENDAR_HISTORY_DAYS)).strftime("%Y%m%d")
+        try:
+            fresh = self.fetch_days(fromdate, today)
+        except Exception:
+            fresh = []
+        if fresh:
+            self._set_days(self.days + [d for d in fresh if d <= today])
+            self.store.write("calendar", "krx", pd.DataFrame({"date": self.days}))
+        self._checked_at = time.monotonic()
+
+    def _ensure(self, now: dt.datetime) -> None:
+        epoch = boundary_epoch(now)
+        today = now.strftime("%Y%m%d")
+        waiting_today = (
+            epoch.endswith("-open")
+            and now.weekday() < 5
+            and today not in self.pos
+            and time.monotonic() - self._checked_at >= CALENDAR_RETRY_SEC
+        )
+        # 원천 실패로 아직 거래일이 없으면 경계와 무관하게 CALENDAR_RETRY_SEC 마다 다시 시도
+        retry_empty = not self.days and time.monotonic() - self._checked_at >= CALENDAR_RETRY_SEC
+        due = (epoch != self._epoch and bool(self.days)) or retry_empty or waiting_today
+        if not due:
+            return
+        with self._lock:
+            if epoch != self._epoch or waiting_today or retry_empty:
+                self._refresh(now)
+                if self.days:
+                    self._epoch = epoch
+                self._latest = self._latest_from_days(now)
+
+    def _latest_from_days(self, now: dt.datetime) -> str:
+        today = now.strftime("%Y%m%d")
+        if not self.days:
+            # 캘린더를 아직 못 받았으면 최근 평일(휴장일은 구분 못 함)
+            d = now.date() if now.time() >= MARKET_OPEN else now.date() - dt.timedelta(days=1)
+            while d.weekday() >= 5:
+                d -= dt.timedelta(days=1)
+            return d.strftime("%Y%m%d")
+        if today in self.pos and now.time() >= MARKET_OPEN:
+            return today
+        i = bisect.bisect_left(self.days, today)
+        return self.days[i - 1] if i > 0 else today
+
+    def latest(self, now: Optional[dt.datetime] = None) -> str:
+        """오늘 기준 가장 최근 영업일(YYYYMMDD). 당일이 영업일이면 당일."""
+        self._ensure(now or now_kst())
+        return self._latest
+
+    def previous(self, day: str, n: int = 1) -> str:
+        """day 보다 n 영업일 앞선 날. day 가 영업일이면 위치 조회 O(1)."""
+        self._ensure(now_kst())
+        i = self.pos.get(day)
+        if i is None:
+            i = bisect.bisect_left(self.days, day)
+        return self.days[max(i - n, 0)] if self.days else day
+
+    def extend_back(self, day: str) -> None:
+        """day 까지 앞 구간 거래일을 받아 붙인다(보관 구간보다 긴 백테스트/백필용). 원천 실패 시 그대로."""
+        self._ensure(now_kst())
+        with self._lock:
+            if self.days and day >= self.days[0]:
+                return
+            end = self.days[0] if self.days else now_kst().strftime("%Y%m%d")
+            try:
+                fresh = self.fetch_days(day, end)
+            except Exception:
+                return
+            if fresh:
+                self._set_days(self.days + fresh)
+                self.store.write("calendar", "krx", pd.DataFrame({"date": self.days}))
+
+    def first_on_or_after(self, day: str) -> str:
+        """day 이후 첫 영업일. 캘린더 보관 구간(첫날) 이전이거나 이후면 day 그대로."""
+        self._ensure(now_kst())
+        if not self.days or day < self.days[0]:
+            return day
+        i = bisect.bisect_left(self.days, day)
+        return self.days[i] if i < len(self.days) else day